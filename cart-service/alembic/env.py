@@ -19,10 +19,18 @@ sys.path.insert(0, root_path)
 
 # add your model's MetaData object here for 'autogenerate' support
 try:
+    from app.config import settings
     from app.database import Base
     from app.models.cart import Cart
     from app.models.cart_item import CartItem
+    from app.models.outbox import OutboxEvent
     target_metadata = Base.metadata
+
+    # Берём URL из настроек приложения; миграции выполняются синхронным драйвером
+    config.set_main_option(
+        "sqlalchemy.url",
+        settings.database_url.replace("postgresql+asyncpg://", "postgresql+psycopg2://")
+    )
 except ImportError as e:
     print(f"Warning: Could not import models: {e}")
     target_metadata = None
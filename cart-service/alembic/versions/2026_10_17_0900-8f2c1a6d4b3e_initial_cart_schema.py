@@ -0,0 +1,57 @@
+"""initial cart schema
+
+Revision ID: 8f2c1a6d4b3e
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2c1a6d4b3e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Таблицы могли быть созданы раньше через Base.metadata.create_all —
+    # в этом случае только фиксируем версию схемы
+    if op.get_context().as_sql:
+        existing_tables = set()
+    else:
+        existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "carts" not in existing_tables:
+        op.create_table(
+            "carts",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_carts_id", "carts", ["id"], unique=False)
+
+    if "cart_items" not in existing_tables:
+        op.create_table(
+            "cart_items",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("cart_id", sa.String(), nullable=True),
+            sa.Column("product_id", sa.Integer(), nullable=True),
+            sa.Column("quantity", sa.Integer(), nullable=True),
+            sa.Column("price_at_add", sa.Float(), nullable=True),
+            sa.ForeignKeyConstraint(["cart_id"], ["carts.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_cart_items_id", "cart_items", ["id"], unique=False)
+        op.create_index("ix_cart_items_product_id", "cart_items", ["product_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cart_items_product_id", table_name="cart_items")
+    op.drop_index("ix_cart_items_id", table_name="cart_items")
+    op.drop_table("cart_items")
+    op.drop_index("ix_carts_id", table_name="carts")
+    op.drop_table("carts")
@@ -0,0 +1,104 @@
+"""add cart hot path indexes
+
+Revision ID: c4e9b07a15d2
+Revises: 8f2c1a6d4b3e
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e9b07a15d2'
+down_revision = '8f2c1a6d4b3e'
+branch_labels = None
+depends_on = None
+
+
+# Индексы горячих путей: (имя, таблица, колонки, unique)
+HOT_PATH_INDEXES = [
+    ("ix_cart_items_cart_id_product_id", "cart_items", ["cart_id", "product_id"], True),
+    ("ix_carts_updated_at", "carts", ["updated_at"], False),
+]
+
+
+def dedupe_cart_items() -> None:
+    """
+    Схлопывает дубли (cart_id, product_id) одной командой: количество
+    суммируется в позицию с наименьшим id, остальные удаляются.
+    """
+    op.execute(
+        """
+        WITH ranked AS (
+            SELECT id,
+                   min(id) OVER (PARTITION BY cart_id, product_id) AS keep_id,
+                   sum(quantity) OVER (PARTITION BY cart_id, product_id) AS total_quantity
+            FROM cart_items
+        ),
+        merged AS (
+            UPDATE cart_items
+            SET quantity = ranked.total_quantity
+            FROM ranked
+            WHERE cart_items.id = ranked.id
+              AND ranked.id = ranked.keep_id
+              AND ranked.total_quantity <> cart_items.quantity
+            RETURNING cart_items.id
+        )
+        DELETE FROM cart_items
+        USING ranked
+        WHERE cart_items.id = ranked.id
+          AND ranked.id <> ranked.keep_id
+        """
+    )
+
+
+def index_state(name: str):
+    """
+    True/False — индекс есть и валиден/невалиден, None — индекса нет.
+    В offline-режиме (--sql) состояние неизвестно: считаем индекс невалидным.
+    """
+    if op.get_context().as_sql:
+        return False
+    return op.get_bind().execute(
+        sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name},
+    ).scalar()
+
+
+def upgrade() -> None:
+    # CONCURRENTLY не блокирует запись в горячие таблицы, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in HOT_PATH_INDEXES:
+            state = index_state(name)
+            if state:
+                continue
+
+            # Прерванная сборка CONCURRENTLY оставляет INVALID-индекс, который
+            # IF NOT EXISTS пропустил бы, а ON CONFLICT не может использовать
+            if state is False:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+            # Дубли убираем непосредственно перед сборкой: старые экземпляры
+            # сервиса могли вставить их после предыдущей попытки
+            if unique:
+                dedupe_cart_items()
+
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=unique,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_carts_updated_at", table_name="carts", postgresql_concurrently=True, if_exists=True)
+        op.drop_index(
+            "ix_cart_items_cart_id_product_id",
+            table_name="cart_items",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,45 @@
+"""add cart totals
+
+Revision ID: 5a7d3e9c2f18
+Revises: c4e9b07a15d2
+Create Date: 2026-10-17 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7d3e9c2f18'
+down_revision = 'c4e9b07a15d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("carts", sa.Column("total_items", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("carts", sa.Column("total_amount", sa.Numeric(12, 2), server_default="0", nullable=False))
+    op.add_column("carts", sa.Column("version", sa.Integer(), server_default="0", nullable=False))
+
+    # Заполняем итоги для существующих корзин
+    op.execute(
+        """
+        UPDATE carts
+        SET total_items = totals.total_items,
+            total_amount = totals.total_amount
+        FROM (
+            SELECT cart_id,
+                   coalesce(sum(quantity), 0) AS total_items,
+                   coalesce(sum(CAST(quantity * price_at_add AS NUMERIC(12, 2))), 0) AS total_amount
+            FROM cart_items
+            GROUP BY cart_id
+        ) AS totals
+        WHERE carts.id = totals.cart_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("carts", "version")
+    op.drop_column("carts", "total_amount")
+    op.drop_column("carts", "total_items")
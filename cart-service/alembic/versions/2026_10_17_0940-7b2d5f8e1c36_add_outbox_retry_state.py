@@ -0,0 +1,42 @@
+"""add outbox retry state
+
+Revision ID: 7b2d5f8e1c36
+Revises: e3b6f41a9c07
+Create Date: 2026-10-17 09:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2d5f8e1c36'
+down_revision = 'e3b6f41a9c07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("outbox", sa.Column("next_attempt_at", sa.DateTime(), nullable=True))
+    op.add_column("outbox", sa.Column("failed_at", sa.DateTime(), nullable=True))
+
+    # Индекс ожидающих событий больше не включает исчерпавшие попытки
+    op.drop_index("ix_outbox_pending", table_name="outbox")
+    op.create_index(
+        "ix_outbox_pending",
+        "outbox",
+        ["id"],
+        postgresql_where=sa.text("sent_at IS NULL AND failed_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_pending", table_name="outbox")
+    op.create_index(
+        "ix_outbox_pending",
+        "outbox",
+        ["id"],
+        postgresql_where=sa.text("sent_at IS NULL"),
+    )
+    op.drop_column("outbox", "failed_at")
+    op.drop_column("outbox", "next_attempt_at")
@@ -0,0 +1,30 @@
+"""add outbox pending key index
+
+Revision ID: d1f8a4c6b2e9
+Revises: 7b2d5f8e1c36
+Create Date: 2026-10-17 09:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1f8a4c6b2e9'
+down_revision = '7b2d5f8e1c36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Relay пропускает событие, пока не отправлено более раннее событие того же ключа
+    op.create_index(
+        "ix_outbox_pending_key",
+        "outbox",
+        ["topic", "key", "id"],
+        postgresql_where=sa.text("sent_at IS NULL AND failed_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_pending_key", table_name="outbox")
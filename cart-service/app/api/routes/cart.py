@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Union
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Union
 
 from ...database import get_db
 from ...schemas.cart import Cart as CartSchema, CartSummary
-from ...schemas.cart_item import CartItem, CartItemCreate, CartItemUpdate
+from ...schemas.cart_item import CartItem, CartItemCreate, CartItemUpdate, CartItemBatchCreate, CartItemBatchResponse
 from ...services.cart_service import CartService
 from ..dependencies import get_current_user_or_session
 
@@ -13,31 +13,43 @@ router = APIRouter()
 
 @router.get("/cart", response_model=CartSummary)
 async def get_cart(
+        include: Optional[str] = Query(None, description="items — вернуть позиции корзины"),
         cart_id: str = Depends(get_current_user_or_session),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    """Получение текущей корзины пользователя"""
+    """Получение текущей корзины пользователя (итоги; позиции — с ?include=items)"""
     cart_service = CartService(db)
-    return cart_service.get_cart(cart_id)  # Этот метод синхронный
+    return await cart_service.get_cart(cart_id, include_items=include == "items")
 
 
 @router.post("/cart/items", response_model=CartItem)
 async def add_item_to_cart(
         item: CartItemCreate,
         cart_id: str = Depends(get_current_user_or_session),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Добавление товара в корзину"""
     cart_service = CartService(db)
     return await cart_service.add_item(cart_id, item)  # ✅ Добавили await
 
 
+@router.post("/cart/items:batch", response_model=CartItemBatchResponse)
+async def add_items_to_cart(
+        batch: CartItemBatchCreate,
+        cart_id: str = Depends(get_current_user_or_session),
+        db: AsyncSession = Depends(get_db)
+):
+    """Пакетное добавление товаров в корзину (восстановление корзины, повтор заказа)"""
+    cart_service = CartService(db)
+    return await cart_service.add_items(cart_id, batch.items)
+
+
 @router.put("/cart/items/{product_id}", response_model=Union[CartItem, dict])
 async def update_cart_item(
         product_id: int,
         item: CartItemUpdate,
         cart_id: str = Depends(get_current_user_or_session),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Обновление количества товара в корзине"""
     cart_service = CartService(db)
@@ -52,7 +64,7 @@ async def update_cart_item(
 async def remove_item_from_cart(
         product_id: int,
         cart_id: str = Depends(get_current_user_or_session),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Удаление товара из корзины"""
     cart_service = CartService(db)
@@ -67,7 +79,7 @@ async def remove_item_from_cart(
 @router.delete("/cart")
 async def clear_cart(
         cart_id: str = Depends(get_current_user_or_session),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Очистка корзины"""
     cart_service = CartService(db)
@@ -82,7 +94,7 @@ async def clear_cart(
 @router.post("/cart/checkout")
 async def checkout_cart(
         cart_id: str = Depends(get_current_user_or_session),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Оформление заказа"""
     cart_service = CartService(db)
@@ -1,13 +1,18 @@
-from sqlalchemy import create_engine, text
+import os
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 
-# ВАЖНО: Используем обычный psycopg2 драйвер для синхронного кода
-# Меняем postgresql+asyncpg на postgresql+psycopg2
-database_url = settings.database_url.replace("postgresql+asyncpg://", "postgresql+psycopg2://")
+# Используем asyncpg: все роуты и обработчики событий асинхронные,
+# поэтому запросы к БД не должны блокировать event loop
+database_url = settings.database_url.replace("postgresql+psycopg2://", "postgresql+asyncpg://")
 
-engine = create_engine(
+engine = create_async_engine(
     database_url,
     pool_pre_ping=True,
     pool_size=10,
@@ -15,26 +20,59 @@ engine = create_engine(
     echo=settings.debug
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = sessionmaker(
+    engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """Dependency для получения сессии БД"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
 
 
-def test_connection():
+async def test_connection():
     """Тест подключения к БД"""
     try:
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
-        db.close()
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
         return True
     except Exception as e:
         print(f"Database connection failed: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+# Корень сервиса, где лежат alembic.ini и каталог alembic/
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def get_migration_heads() -> set[str]:
+    """Head-ревизии из скриптов миграций"""
+    config = Config(os.path.join(SERVICE_ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVICE_ROOT, "alembic"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+async def check_migrations():
+    """
+    Проверяет, что схема БД соответствует последней миграции.
+    Схема создаётся только через `alembic upgrade head`, не при старте приложения.
+    """
+    async with engine.connect() as conn:
+        current = await conn.run_sync(
+            lambda sync_conn: set(MigrationContext.configure(sync_conn).get_current_heads())
+        )
+
+    expected = get_migration_heads()
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is out of date (current: {sorted(current) or 'none'}, "
+            f"expected: {sorted(expected)}). Run 'alembic upgrade head'."
+        )
@@ -1,5 +1,8 @@
 from .producer import EventProducer
-from .consumer import EventConsumer
+from .consumer import EventConsumer, event_consumer
 from .handlers import CartEventHandlers
+from .outbox import OutboxRelay, outbox_relay
+from .product_cache_invalidator import ProductCacheInvalidator, product_cache_invalidator
 
-__all__ = ["EventProducer", "EventConsumer", "CartEventHandlers"]
\ No newline at end of file
+__all__ = ["EventProducer", "EventConsumer", "event_consumer", "CartEventHandlers", "OutboxRelay", "outbox_relay",
+           "ProductCacheInvalidator", "product_cache_invalidator"]
\ No newline at end of file
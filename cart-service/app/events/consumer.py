@@ -1,10 +1,10 @@
-import json
-import asyncio
-from typing import Dict, Any, Callable
+from typing import Dict, Callable, Optional
 from aiokafka import AIOKafkaConsumer
-from aiokafka.errors import KafkaError
 import logging
 
+from shared.utils.consumer_engine import PartitionedConsumerEngine
+from shared.utils.kafka_utils import decode_event, get_event_type
+
 from ..config import settings
 
 logger = logging.getLogger(__name__)
@@ -17,22 +17,32 @@ class EventConsumer:
         self.group_id = settings.kafka_group_id
         self.handlers: Dict[str, Callable] = {}
         self.running = False
+        self.engine: Optional[PartitionedConsumerEngine] = None
 
     async def start(self, topics: list[str]):
         """Инициализирует и запускает Kafka consumer"""
         try:
             self.consumer = AIOKafkaConsumer(
-                *topics,
                 bootstrap_servers=self.bootstrap_servers,
                 group_id=self.group_id,
-                value_deserializer=lambda m: json.loads(m.decode('utf-8')),
                 key_deserializer=lambda k: k.decode('utf-8') if k else None,
                 auto_offset_reset='earliest',  # Читаем с начала при первом запуске
                 enable_auto_commit=False,  # Ручное подтверждение обработки
-                max_poll_records=10,  # Обрабатываем по 10 сообщений за раз
+                max_poll_records=100,  # Сообщений за один опрос (раздаются по партициям)
                 session_timeout_ms=30000,
                 heartbeat_interval_ms=10000
             )
+            self.engine = PartitionedConsumerEngine(
+                self.consumer,
+                self._process_message,
+                max_in_flight=settings.kafka_max_in_flight_per_partition,
+                max_buffered=settings.kafka_max_buffered_per_partition,
+                commit_every=settings.kafka_commit_every_messages,
+                commit_interval_ms=settings.kafka_commit_interval_ms
+            )
+            # Listener коммитит обработанное перед отзывом партиций при ребалансировке
+            self.consumer.subscribe(topics, listener=self.engine.rebalance_listener())
+
             await self.consumer.start()
             logger.info(f"Kafka consumer started for topics: {topics}")
         except Exception as e:
@@ -42,6 +52,8 @@ class EventConsumer:
     async def stop(self):
         """Останавливает Kafka consumer"""
         self.running = False
+        if self.engine:
+            await self.engine.stop()
         if self.consumer:
             try:
                 await self.consumer.stop()
@@ -55,34 +67,15 @@ class EventConsumer:
         logger.info(f"Registered handler for event type: {event_type}")
 
     async def consume_messages(self):
-        """Основной цикл обработки сообщений"""
+        """Основной цикл обработки сообщений: партиции обрабатываются параллельно"""
+        if not self.consumer:
+            raise RuntimeError("Consumer not started")
+
         self.running = True
         logger.info("Starting message consumption...")
 
         try:
-            while self.running:
-                try:
-                    # Получаем пакет сообщений
-                    msg_pack = await self.consumer.getmany(timeout_ms=1000)
-
-                    if not msg_pack:
-                        continue
-
-                    # Обрабатываем сообщения по топикам
-                    for topic_partition, messages in msg_pack.items():
-                        for message in messages:
-                            await self._process_message(message)
-
-                    # Подтверждаем обработку всех сообщений в пакете
-                    await self.consumer.commit()
-
-                except KafkaError as e:
-                    logger.error(f"Kafka error during message consumption: {e}")
-                    await asyncio.sleep(5)  # Пауза перед повторной попыткой
-                except Exception as e:
-                    logger.error(f"Unexpected error during message consumption: {e}")
-                    await asyncio.sleep(1)
-
+            await self.engine.run()
         except Exception as e:
             logger.error(f"Fatal error in message consumption loop: {e}")
         finally:
@@ -91,7 +84,13 @@ class EventConsumer:
     async def _process_message(self, message):
         """Обрабатывает одно сообщение"""
         try:
-            event = message.value
+            # Маршрутизация по заголовку: без обработчика значение не декодируем
+            header_type = get_event_type(message.headers)
+            if header_type is not None and header_type not in self.handlers:
+                logger.debug(f"No handler registered for event type: {header_type}, skipping")
+                return
+
+            event = decode_event(message.value, message.headers)
             event_type = event.get("event_type")
             event_id = event.get("event_id")
             payload = event.get("payload", {})
@@ -107,7 +106,7 @@ class EventConsumer:
             else:
                 logger.warning(f"No handler registered for event type: {event_type}")
 
-        except json.JSONDecodeError as e:
+        except (ValueError, TypeError) as e:
             logger.error(f"Failed to decode message: {e}")
         except Exception as e:
             logger.error(f"Error processing message: {e}")
@@ -123,4 +122,8 @@ class EventConsumer:
             return self.running and not self.consumer._closed
         except Exception as e:
             logger.error(f"Health check failed: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+# Глобальный экземпляр consumer'а
+event_consumer = EventConsumer()
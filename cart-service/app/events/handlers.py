@@ -1,13 +1,25 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, cast, func, literal, Float
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
+import asyncio
 import logging
-
-from ..database import SessionLocal
+import random
+import uuid
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.cart import Cart, CART_AMOUNT_TYPE
+from ..models.cart_item import CartItem
+from ..models.outbox import OutboxEvent
 from ..services.cart_service import CartService
 from ..services.catalog_client import CatalogClient
 
 logger = logging.getLogger(__name__)
 
+# SQLSTATE deadlock_detected: PostgreSQL откатил транзакцию, чтобы разорвать цикл блокировок
+DEADLOCK_DETECTED = "40P01"
+
 
 class CartEventHandlers:
     """Обработчики событий для cart-service"""
@@ -15,9 +27,9 @@ class CartEventHandlers:
     def __init__(self):
         self.catalog_client = CatalogClient()
 
-    def get_db_session(self) -> Session:
+    def get_db_session(self) -> AsyncSession:
         """Получает сессию базы данных"""
-        return SessionLocal()
+        return AsyncSessionLocal()
 
     async def handle_product_updated(self, payload: Dict[Any, Any], event: Dict[Any, Any]):
         """
@@ -98,67 +110,156 @@ class CartEventHandlers:
                 return
 
             # Очищаем корзину
-            db = self.get_db_session()
-            try:
+            async with self.get_db_session() as db:
                 cart_service = CartService(db)
                 await cart_service.clear_cart(cart_id)
                 logger.info(f"Cart {cart_id} cleared after order {order_id} creation")
-            finally:
-                db.close()
 
         except Exception as e:
             logger.error(f"Error handling order_created event: {e}")
 
     async def _update_price_in_carts(self, product_id: int, new_price: float):
-        """Обновляет цену товара во всех корзинах"""
-        db = self.get_db_session()
-        try:
-            from ..models.cart_item import CartItem
-
-            cart_items = db.query(CartItem).filter(CartItem.product_id == product_id).all()
-
-            for item in cart_items:
-                old_price = item.price_at_add
-                price_diff = abs(new_price - old_price) / old_price * 100  # Процент изменения
-
-                # Обновляем цену только если изменение значительное (больше 5%)
-                if price_diff > 5:
-                    item.price_at_add = new_price
-                    db.commit()
+        """
+        Обновляет цену товара во всех корзинах одним запросом.
 
-                    # Здесь можно отправить уведомление пользователю через notification-service
-                    logger.info(
-                        f"Updated price for product {product_id} in cart {item.cart_id}: {old_price} -> {new_price}")
+        Позиции, где цена изменилась больше чем на price_change_threshold_percent,
+        обновляются вместе с итогами их корзин; затронутые корзины
+        публикуются через outbox событиями cart.prices.updated по
+        cart_notification_batch_size корзин, чтобы сообщение не превышало
+        лимит размера брокера.
 
-        finally:
-            db.close()
+        Позиции блокируются в порядке (cart_id, id), но корзины обновляются
+        в произвольном порядке и могут встать в цикл блокировок с запросами
+        API; транзакцию, выбранную жертвой deadlock, повторяем.
+        """
+        new_price = literal(new_price, Float)
+
+        # Старые цены нужны для пересчёта итогов; FOR UPDATE читает актуальную версию строки.
+        # Единый порядок блокировок не даёт параллельным обновлениям цен заблокировать друг друга
+        old_items = (
+            select(CartItem.id, CartItem.price_at_add.label("old_price"))
+            .where(
+                CartItem.product_id == product_id,
+                CartItem.price_at_add > 0,
+                func.abs(new_price - CartItem.price_at_add) / CartItem.price_at_add * 100
+                > settings.price_change_threshold_percent
+            )
+            .order_by(CartItem.cart_id, CartItem.id)
+            .with_for_update()
+            .subquery("old_items")
+        )
+        changed_items = (
+            update(CartItem)
+            .where(CartItem.id == old_items.c.id)
+            .values(price_at_add=new_price)
+            .returning(
+                CartItem.cart_id,
+                cast(CartItem.quantity * (new_price - old_items.c.old_price), CART_AMOUNT_TYPE).label("amount_delta")
+            )
+            .cte("changed_items")
+        )
+        cart_deltas = (
+            select(changed_items.c.cart_id, func.sum(changed_items.c.amount_delta).label("amount_delta"))
+            .group_by(changed_items.c.cart_id)
+            .cte("cart_deltas")
+        )
+        updated_carts = (
+            update(Cart)
+            .where(Cart.id == cart_deltas.c.cart_id)
+            .values(
+                total_amount=Cart.total_amount + cart_deltas.c.amount_delta,
+                version=Cart.version + 1
+            )
+            .returning(Cart.id)
+            .cte("updated_carts")
+        )
+
+        for attempt in range(1, settings.price_update_max_attempts + 1):
+            try:
+                cart_ids = await self._apply_price_update(select(updated_carts.c.id), product_id, new_price)
+                break
+            except DBAPIError as e:
+                if getattr(e.orig, "sqlstate", None) != DEADLOCK_DETECTED or attempt == settings.price_update_max_attempts:
+                    raise
+                delay = settings.price_update_retry_backoff_ms * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                logger.warning(
+                    f"🔁 Deadlock updating price of product {product_id}, retrying in {delay:.0f} ms (attempt {attempt})"
+                )
+                await asyncio.sleep(delay / 1000)
+
+        if cart_ids:
+            logger.info(f"Updated price for product {product_id} in {len(cart_ids)} carts -> {new_price.value}")
+
+    async def _apply_price_update(self, statement, product_id: int, new_price) -> list:
+        """Одна попытка: обновление цен и итогов плюс события outbox в одной транзакции"""
+        async with self.get_db_session() as db:
+            result = await db.execute(statement)
+            cart_ids = result.scalars().all()
+
+            if not cart_ids:
+                await db.rollback()
+                return []
+
+            batch_size = settings.cart_notification_batch_size
+            db.add_all([
+                OutboxEvent(
+                    event_id=str(uuid.uuid4()),
+                    topic="cart.prices.updated",
+                    event_type="cart_prices_updated",
+                    key=str(product_id),
+                    payload={
+                        "product_id": product_id,
+                        "new_price": new_price.value,
+                        "cart_ids": cart_ids[start:start + batch_size],
+                        "action": "prices_updated"
+                    }
+                )
+                for start in range(0, len(cart_ids), batch_size)
+            ])
+            await db.commit()
+
+        return cart_ids
 
     async def _notify_about_deactivated_product(self, product_id: int):
         """Уведомляет пользователей о деактивации товара в их корзинах"""
-        db = self.get_db_session()
-        try:
-            from ..models.cart_item import CartItem
-
-            cart_items = db.query(CartItem).filter(CartItem.product_id == product_id).all()
-
-            for item in cart_items:
-                # Здесь можно отправить уведомление через notification-service
-                logger.info(f"Product {product_id} in cart {item.cart_id} has been deactivated")
-
-        finally:
-            db.close()
+        await self._notify_carts_with_product(product_id, "deactivated")
 
     async def _notify_about_out_of_stock(self, product_id: int):
         """Уведомляет пользователей о том, что товар закончился"""
-        db = self.get_db_session()
-        try:
-            from ..models.cart_item import CartItem
-
-            cart_items = db.query(CartItem).filter(CartItem.product_id == product_id).all()
+        await self._notify_carts_with_product(product_id, "out_of_stock")
 
-            for item in cart_items:
-                # Здесь можно отправить уведомление через notification-service
-                logger.info(f"Product {product_id} in cart {item.cart_id} is out of stock")
+    async def _notify_carts_with_product(self, product_id: int, reason: str):
+        """
+        Публикует cart.product.unavailable для всех корзин с товаром.
 
-        finally:
-            db.close()
\ No newline at end of file
+        ID корзин читаются серверным курсором пачками по
+        cart_notification_batch_size и уходят в outbox событием на пачку,
+        поэтому память не зависит от числа корзин.
+        """
+        batch_size = settings.cart_notification_batch_size
+        carts_notified = 0
+
+        async with self.get_db_session() as read_db, self.get_db_session() as write_db:
+            result = await read_db.stream_scalars(
+                select(CartItem.cart_id)
+                .where(CartItem.product_id == product_id)
+                .execution_options(yield_per=batch_size)
+            )
+
+            async for cart_ids in result.partitions():
+                write_db.add(OutboxEvent(
+                    event_id=str(uuid.uuid4()),
+                    topic="cart.product.unavailable",
+                    event_type="cart_product_unavailable",
+                    key=str(product_id),
+                    payload={
+                        "product_id": product_id,
+                        "reason": reason,
+                        "cart_ids": list(cart_ids),
+                        "action": "product_unavailable"
+                    }
+                ))
+                await write_db.commit()
+                carts_notified += len(cart_ids)
+
+        logger.info(f"Product {product_id} is {reason}: notified {carts_notified} carts")
@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import select, update, delete, func, or_, exists
+from sqlalchemy.orm import aliased
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.outbox import OutboxEvent
+from ..services.kafka_client import kafka_client
+
+logger = logging.getLogger(__name__)
+
+
+def split_by_key_order(events: Sequence[OutboxEvent]) -> List[List[OutboxEvent]]:
+    """
+    Раскладывает события пачки по волнам публикации: в волне N — N-е событие
+    каждого ключа (topic, key). События без ключа порядка не требуют и все
+    уходят в первую волну.
+    """
+    waves: List[List[OutboxEvent]] = []
+    positions: Dict[tuple, int] = {}
+
+    for event in events:
+        if event.key is None:
+            position = 0
+        else:
+            position = positions.get((event.topic, event.key), 0)
+            positions[(event.topic, event.key)] = position + 1
+
+        if position == len(waves):
+            waves.append([])
+        waves[position].append(event)
+
+    return waves
+
+
+class OutboxRelay:
+    """
+    Фоновая задача, пересылающая события из таблицы outbox в Kafka.
+
+    Неотправленные строки выбираются пачками с FOR UPDATE SKIP LOCKED
+    (несколько экземпляров сервиса не мешают друг другу), публикуются одним
+    батчем продюсера и помечаются отправленными в той же транзакции.
+    Порядок событий одного ключа сохраняется: событие не выбирается, пока
+    более раннее событие того же ключа не отправлено, а внутри пачки события
+    ключа публикуются волнами — после неудачи остальные события ключа
+    остаются в outbox до следующей попытки.
+    Доставка — at-least-once: при сбое строка остаётся в outbox и будет
+    отправлена повторно с тем же event_id после экспоненциальной паузы.
+    После outbox_max_attempts неудач строка помечается failed_at и больше не
+    выбирается, чтобы «ядовитое» событие не задерживало остальные.
+    """
+
+    def __init__(self):
+        self.batch_size = settings.outbox_batch_size
+        self.poll_interval = settings.outbox_poll_interval_ms / 1000
+        self.retention = timedelta(hours=settings.outbox_retention_hours)
+        self.max_attempts = settings.outbox_max_attempts
+        self.retry_backoff = settings.outbox_retry_backoff_ms / 1000
+        self.retry_backoff_max = settings.outbox_retry_backoff_max_ms / 1000
+        self.shutdown_flush_timeout = settings.outbox_shutdown_flush_seconds
+        self.running = False
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+
+        # Метрики
+        self.published = 0
+        self.failed = 0
+        self.dead_lettered = 0
+
+    async def start(self):
+        """Запуск фоновой пересылки"""
+        if self._task and not self._task.done():
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info("✅ Outbox relay started")
+
+    async def stop(self):
+        """Остановка: дожидаемся текущей пачки и досылаем оставшееся (не дольше лимита)"""
+        self.running = False
+        if self._task:
+            try:
+                await self._task
+            except Exception as e:
+                logger.error(f"❌ Outbox relay task failed: {e}")
+            self._task = None
+
+        try:
+            await asyncio.wait_for(self._flush(), timeout=self.shutdown_flush_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Outbox flush on shutdown exceeded {self.shutdown_flush_timeout}s, rest will be relayed later")
+        except Exception as e:
+            logger.error(f"❌ Error flushing outbox on shutdown: {e}")
+
+        logger.info("✅ Outbox relay stopped")
+
+    async def _flush(self):
+        """Отправляет пачки, пока они отправляются полностью"""
+        while await self.relay_batch() == self.batch_size:
+            pass
+
+    async def _run(self):
+        """Основной цикл пересылки"""
+        while self.running:
+            try:
+                sent = await self.relay_batch()
+
+                # Полная пачка отправлена — вероятно, есть ещё события, не ждём.
+                # При ошибках брокера sent < batch_size, и цикл делает паузу
+                if sent < self.batch_size:
+                    await self._purge_sent()
+                    await asyncio.sleep(self.poll_interval)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error relaying outbox events: {e}")
+                await asyncio.sleep(1)
+
+    async def relay_batch(self) -> int:
+        """Отправляет одну пачку событий; возвращает число отправленных"""
+        # Более раннее неотправленное событие того же ключа (в паузе после
+        # неудачи или заблокированное другим экземпляром) задерживает остальные
+        older = aliased(OutboxEvent)
+        older_pending = exists().where(
+            older.topic == OutboxEvent.topic,
+            older.key == OutboxEvent.key,
+            older.id < OutboxEvent.id,
+            older.sent_at.is_(None),
+            older.failed_at.is_(None)
+        )
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(OutboxEvent)
+                .where(
+                    OutboxEvent.sent_at.is_(None),
+                    OutboxEvent.failed_at.is_(None),
+                    or_(OutboxEvent.next_attempt_at.is_(None), OutboxEvent.next_attempt_at <= func.now()),
+                    or_(OutboxEvent.key.is_(None), ~older_pending)
+                )
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = result.scalars().all()
+
+            if not events:
+                return 0
+
+            sent_ids = []
+            failed = 0
+            for event, error in (await self.publish_in_key_order(events)).items():
+                if error is None:
+                    sent_ids.append(event.id)
+                else:
+                    self._record_failure(event, error)
+                    failed += 1
+
+            if sent_ids:
+                await db.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_(sent_ids))
+                    .values(sent_at=func.now())
+                )
+
+            await db.commit()
+
+            self.published += len(sent_ids)
+            self.failed += failed
+
+            if sent_ids:
+                logger.info(f"📤 Relayed {len(sent_ids)}/{len(events)} outbox events")
+
+            return len(sent_ids)
+
+    async def publish_in_key_order(
+            self,
+            events: Sequence[OutboxEvent]
+    ) -> Dict[OutboxEvent, Optional[BaseException]]:
+        """
+        Публикует события волнами (см. split_by_key_order). Ключ, событие
+        которого не доставлено, дальше не публикуется: его следующие события
+        не попадают в результат и остаются неотправленными без новой попытки.
+        Возвращает результат по опубликованным событиям: None — доставлено.
+        """
+        outcomes: Dict[OutboxEvent, Optional[BaseException]] = {}
+        blocked = set()
+
+        for wave in split_by_key_order(events):
+            wave = [event for event in wave if (event.topic, event.key) not in blocked]
+            if not wave:
+                continue
+
+            records = [
+                (
+                    event.topic,
+                    kafka_client.build_event(event.event_type, event.payload, event.event_id, event.created_at),
+                    event.key
+                )
+                for event in wave
+            ]
+            for event, error in zip(wave, await kafka_client.publish_batch(records)):
+                outcomes[event] = error
+                if error is not None and event.key is not None:
+                    blocked.add((event.topic, event.key))
+
+        return outcomes
+
+    def _record_failure(self, event: OutboxEvent, error: BaseException):
+        """Неудачная попытка: пауза до следующей или исключение из очереди"""
+        event.attempts += 1
+        event.last_error = str(error)
+
+        if event.attempts >= self.max_attempts:
+            event.failed_at = func.now()
+            self.dead_lettered += 1
+            logger.error(
+                f"❌ Event {event.event_id} ({event.event_type}) failed {event.attempts} times, "
+                f"giving up: {error}"
+            )
+            return
+
+        delay = min(self.retry_backoff * 2 ** (event.attempts - 1), self.retry_backoff_max)
+        event.next_attempt_at = func.now() + timedelta(seconds=delay)
+        logger.error(
+            f"❌ Failed to relay event {event.event_id} ({event.event_type}), "
+            f"retry in {delay:.0f}s: {error}"
+        )
+
+    async def _purge_sent(self):
+        """Периодически удаляет отправленные события старше срока хранения"""
+        if time.monotonic() - self._last_purge < 60:
+            return
+        self._last_purge = time.monotonic()
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(OutboxEvent).where(OutboxEvent.sent_at < func.now() - self.retention)
+            )
+            await db.commit()
+
+        if result.rowcount:
+            logger.info(f"🧹 Purged {result.rowcount} sent outbox events")
+
+    def stats(self) -> dict:
+        """Метрики пересылки"""
+        return {
+            "status": "running" if self.running else "stopped",
+            "published": self.published,
+            "failed": self.failed,
+            "dead_lettered": self.dead_lettered
+        }
+
+
+# Глобальный экземпляр relay
+outbox_relay = OutboxRelay()
@@ -1,4 +1,3 @@
-import json
 import uuid
 from datetime import datetime
 from typing import Dict, Any
@@ -6,6 +5,8 @@ from aiokafka import AIOKafkaProducer
 from aiokafka.errors import KafkaError
 import logging
 
+from shared.utils.kafka_utils import encode_event, get_codec
+
 from ..config import settings
 
 logger = logging.getLogger(__name__)
@@ -14,13 +15,13 @@ class EventProducer:
     def __init__(self):
         self.producer = None
         self.bootstrap_servers = settings.kafka_bootstrap_servers
+        self.codec = get_codec(settings.kafka_codec)
 
     async def start(self):
         """Инициализирует и запускает Kafka producer"""
         try:
             self.producer = AIOKafkaProducer(
                 bootstrap_servers=self.bootstrap_servers,
-                value_serializer=lambda v: json.dumps(v).encode('utf-8'),
                 key_serializer=lambda k: k.encode('utf-8') if k else None,
                 retry_backoff_ms=500,
                 request_timeout_ms=30000,
@@ -58,10 +59,12 @@ class EventProducer:
         }
 
         try:
+            value, headers = encode_event(event, self.codec)
             await self.producer.send_and_wait(
                 topic=topic,
-                value=event,
-                key=key
+                value=value,
+                key=key,
+                headers=headers
             )
             logger.info(f"Event published to topic '{topic}': {event['event_id']}")
         except KafkaError as e:
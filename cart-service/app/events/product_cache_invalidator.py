@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from aiokafka import AIOKafkaConsumer
+
+from shared.utils.kafka_utils import decode_event, get_event_type
+
+from ..config import settings
+from ..services.product_cache import product_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ProductCacheInvalidator:
+    """
+    Инвалидация in-process кэша товаров событиями каталога.
+
+    Кэш свой у каждого экземпляра сервиса, поэтому события читаются без
+    consumer group (group_id=None): каждый экземпляр получает все партиции
+    топиков каталога, а не свою долю, как общий consumer cart-service-group,
+    который пересчитывает цены в корзинах. Offset'ы не коммитятся — чтение
+    начинается с конца топика, более старые изменения кэш к моменту старта
+    ещё не содержит.
+    """
+
+    EVENT_TYPES = {"product_updated", "product_deactivated", "inventory_updated"}
+
+    def __init__(self):
+        self.consumer: Optional[AIOKafkaConsumer] = None
+        self.running = False
+        self._task: Optional[asyncio.Task] = None
+
+        # Метрики
+        self.applied = 0
+        self.errors = 0
+
+    async def start(self):
+        """Запуск чтения событий каталога"""
+        self.consumer = AIOKafkaConsumer(
+            *settings.product_cache_topics,
+            bootstrap_servers=settings.kafka_bootstrap_servers,
+            group_id=None,
+            auto_offset_reset="latest",
+            enable_auto_commit=False
+        )
+        await self.consumer.start()
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"✅ Product cache invalidator started for topics: {settings.product_cache_topics}")
+
+    async def stop(self):
+        """Остановка"""
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.consumer:
+            try:
+                await self.consumer.stop()
+            except Exception as e:
+                logger.error(f"❌ Error stopping product cache invalidator: {e}")
+            self.consumer = None
+        logger.info("✅ Product cache invalidator stopped")
+
+    async def _run(self):
+        """Основной цикл: события применяются к кэшу по порядку"""
+        while self.running:
+            try:
+                batches = await self.consumer.getmany(timeout_ms=1000)
+                for records in batches.values():
+                    for record in records:
+                        self._apply_record(record)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Часть событий могла быть пропущена: сбрасываем кэш целиком
+                self.errors += 1
+                product_cache.clear()
+                logger.error(f"❌ Product cache invalidation failed, cache cleared: {e}")
+                await asyncio.sleep(1)
+
+    def _apply_record(self, record):
+        """Применяет одно событие каталога к кэшу"""
+        event_type = get_event_type(record.headers)
+        if event_type is not None and event_type not in self.EVENT_TYPES:
+            return
+
+        event = decode_event(record.value, record.headers)
+        self.apply(event.get("event_type"), event.get("payload", {}))
+
+    def apply(self, event_type: str, payload: Dict[str, Any]):
+        """Обновляет или сбрасывает запись кэша по событию"""
+        product_id = payload.get("product_id")
+        if not product_id:
+            return
+
+        if event_type == "product_updated":
+            # Если изменения неизвестны — сбрасываем запись
+            changes = payload.get("changes", {})
+            if changes:
+                product_cache.update(product_id, changes)
+            else:
+                product_cache.invalidate(product_id)
+        elif event_type == "product_deactivated":
+            product_cache.invalidate(product_id)
+        elif event_type == "inventory_updated":
+            product_cache.update(product_id, {"inventory": payload.get("new_quantity", 0)})
+        else:
+            return
+
+        self.applied += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики инвалидации"""
+        return {
+            "status": "running" if self._task and not self._task.done() else "stopped",
+            "applied": self.applied,
+            "errors": self.errors
+        }
+
+
+# Глобальный экземпляр инвалидатора
+product_cache_invalidator = ProductCacheInvalidator()
@@ -1,10 +1,17 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
-from .database import test_connection, Base, engine
+from .database import test_connection, check_migrations, engine
 from .services.kafka_client import kafka_client
+from .services.catalog_client import CatalogClient
+from .services.product_cache import product_cache
+from .events.outbox import outbox_relay
+from .events.consumer import event_consumer
+from .events.product_cache_invalidator import product_cache_invalidator
+from .events.handlers import CartEventHandlers
 from .api.routes.cart import router as cart_router  # ✅ ИСПРАВЛЕНО
 
 # Настройка логирования
@@ -14,32 +21,57 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Задача цикла consumer'а событий каталога и заказов
+consumer_task = None
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Управление жизненным циклом приложения"""
+    global consumer_task
+
     # Startup
     logger.info("🚀 Starting Cart Service...")
 
     try:
         # Проверяем подключение к БД
         logger.info("🔌 Testing database connection...")
-        if test_connection():
+        if await test_connection():
             logger.info("✅ Database connection successful")
         else:
             logger.error("❌ Database connection failed")
             raise Exception("Database connection failed")
 
-        # Создаем таблицы БД
-        logger.info("📊 Creating database tables...")
-        Base.metadata.create_all(bind=engine)
-        logger.info("✅ Database tables created")
+        # Проверяем версию схемы БД (таблицы создаются миграциями Alembic)
+        logger.info("📊 Checking database migrations...")
+        await check_migrations()
+        logger.info("✅ Database schema is up to date")
+
+        # Открываем пул HTTP-соединений к catalog-service
+        await CatalogClient.start()
 
         # Запускаем Kafka producer
         logger.info("🔌 Starting Kafka producer...")
         await kafka_client.start_producer()
         logger.info("✅ Kafka producer started")
 
+        # Запускаем пересылку событий из outbox в Kafka
+        await outbox_relay.start()
+
+        # Кэш товаров инвалидируется в каждом экземпляре (без consumer group)
+        await product_cache_invalidator.start()
+
+        # Запускаем consumer: события каталога обновляют цены в корзинах
+        logger.info("🔌 Starting Kafka consumer...")
+        handlers = CartEventHandlers()
+        event_consumer.register_handler("product_updated", handlers.handle_product_updated)
+        event_consumer.register_handler("product_deactivated", handlers.handle_product_deactivated)
+        event_consumer.register_handler("inventory_updated", handlers.handle_inventory_updated)
+        event_consumer.register_handler("order_created", handlers.handle_order_created)
+        await event_consumer.start(settings.kafka_topics)
+        consumer_task = asyncio.create_task(event_consumer.consume_messages())
+        logger.info("✅ Kafka consumer started")
+
         logger.info("🎉 Cart Service started successfully!")
 
         yield  # Приложение работает
@@ -51,12 +83,45 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("🛑 Shutting down Cart Service...")
 
+    try:
+        if consumer_task and not consumer_task.done():
+            consumer_task.cancel()
+            try:
+                await consumer_task
+            except asyncio.CancelledError:
+                pass
+        await event_consumer.stop()
+        logger.info("✅ Kafka consumer stopped")
+    except Exception as e:
+        logger.error(f"❌ Error stopping Kafka consumer: {e}")
+
+    try:
+        await product_cache_invalidator.stop()
+    except Exception as e:
+        logger.error(f"❌ Error stopping product cache invalidator: {e}")
+
+    try:
+        await outbox_relay.stop()
+    except Exception as e:
+        logger.error(f"❌ Error stopping outbox relay: {e}")
+
     try:
         await kafka_client.stop_producer()
         logger.info("✅ Kafka producer stopped")
     except Exception as e:
         logger.error(f"❌ Error stopping Kafka producer: {e}")
 
+    try:
+        await CatalogClient.stop()
+    except Exception as e:
+        logger.error(f"❌ Error stopping catalog HTTP client: {e}")
+
+    try:
+        await engine.dispose()
+        logger.info("✅ Database connection closed")
+    except Exception as e:
+        logger.error(f"❌ Error closing database connection: {e}")
+
     logger.info("✅ Cart Service shut down successfully!")
 
 
@@ -91,13 +156,17 @@ app.include_router(
 async def health_check():
     """Проверка здоровья сервиса"""
     # Проверяем подключение к БД
-    db_status = "healthy" if test_connection() else "unhealthy"
+    db_status = "healthy" if await test_connection() else "unhealthy"
 
     return {
         "status": "healthy",
         "service": settings.app_name,
         "database": db_status,
-        "kafka_producer": "running" if kafka_client.producer else "stopped",
+        "kafka_producer": kafka_client.stats(),
+        "outbox_relay": outbox_relay.stats(),
+        "kafka_consumer": "running" if consumer_task and not consumer_task.done() else "stopped",
+        "product_cache": product_cache.stats(),
+        "product_cache_invalidator": product_cache_invalidator.stats(),
         "version": "1.0.0"
     }
 
@@ -1,4 +1,5 @@
 from .cart import Cart
 from .cart_item import CartItem
+from .outbox import OutboxEvent
 
-__all__ = ["Cart", "CartItem"]
\ No newline at end of file
+__all__ = ["Cart", "CartItem", "OutboxEvent"]
\ No newline at end of file
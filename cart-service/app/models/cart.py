@@ -1,14 +1,22 @@
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, func
 from sqlalchemy.orm import relationship
 from ..database import Base
 
+# Тип денормализованной суммы корзины
+CART_AMOUNT_TYPE = Numeric(12, 2)
+
 
 class Cart(Base):
     __tablename__ = "carts"
 
     id = Column(String, primary_key=True, index=True)  # session_id или user_id
     created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)  # для очистки устаревших корзин
+
+    # Денормализованные итоги; обновляются тем же запросом, что и позиции (см. CartService)
+    total_items = Column(Integer, nullable=False, default=0, server_default="0")
+    total_amount = Column(CART_AMOUNT_TYPE, nullable=False, default=0, server_default="0")
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Связь с позициями корзины
     items = relationship("CartItem", back_populates="cart", cascade="all, delete-orphan")
\ No newline at end of file
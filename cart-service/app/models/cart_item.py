@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # Одна позиция на товар в корзине; цель ON CONFLICT для upsert в CartService
+        Index("ix_cart_items_cart_id_product_id", "cart_id", "product_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     cart_id = Column(String, ForeignKey("carts.id"))
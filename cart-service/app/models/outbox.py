@@ -0,0 +1,37 @@
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from ..database import Base
+
+
+class OutboxEvent(Base):
+    """
+    Transactional outbox: событие записывается в той же транзакции, что и
+    изменение корзины, и отправляется в Kafka фоновым OutboxRelay.
+    """
+    __tablename__ = "outbox"
+    __table_args__ = (
+        # Relay выбирает только ожидающие отправки события в порядке id
+        Index("ix_outbox_pending", "id", postgresql_where=text("sent_at IS NULL AND failed_at IS NULL")),
+        # Проверка «нет более раннего неотправленного события того же ключа»
+        Index(
+            "ix_outbox_pending_key",
+            "topic",
+            "key",
+            "id",
+            postgresql_where=text("sent_at IS NULL AND failed_at IS NULL")
+        ),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    event_id = Column(String(36), nullable=False, unique=True)  # UUID события, стабилен между повторами
+    topic = Column(String(255), nullable=False)
+    event_type = Column(String(100), nullable=False)
+    key = Column(String, nullable=True)  # Ключ партиционирования
+    payload = Column(JSONB, nullable=False)
+
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    sent_at = Column(DateTime, nullable=True)  # NULL — ещё не отправлено
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)  # Не раньше — пауза после неудачной попытки
+    failed_at = Column(DateTime, nullable=True)  # Исчерпаны попытки: событие исключено из очереди
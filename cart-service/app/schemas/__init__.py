@@ -1,4 +1,20 @@
 from .cart import Cart, CartSummary
-from .cart_item import CartItem, CartItemCreate, CartItemUpdate
+from .cart_item import (
+    CartItem,
+    CartItemCreate,
+    CartItemUpdate,
+    CartItemBatchCreate,
+    CartItemBatchResult,
+    CartItemBatchResponse
+)
 
-__all__ = ["Cart", "CartSummary", "CartItem", "CartItemCreate", "CartItemUpdate"]
\ No newline at end of file
+__all__ = [
+    "Cart",
+    "CartSummary",
+    "CartItem",
+    "CartItemCreate",
+    "CartItemUpdate",
+    "CartItemBatchCreate",
+    "CartItemBatchResult",
+    "CartItemBatchResponse"
+]
\ No newline at end of file
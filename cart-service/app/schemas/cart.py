@@ -25,7 +25,8 @@ class CartSummary(BaseModel):
     cart_id: str
     total_items: int
     total_amount: float
-    items: List[CartItem]
+    version: int = 0
+    items: List[CartItem] = []
 
     class Config:
         from_attributes = True
\ No newline at end of file
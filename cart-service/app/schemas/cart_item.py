@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 
 class CartItemBase(BaseModel):
@@ -21,4 +21,22 @@ class CartItem(CartItemBase):
     price_at_add: float
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class CartItemBatchCreate(BaseModel):
+    items: List[CartItemCreate] = Field(..., min_length=1, max_length=100)
+
+
+class CartItemBatchResult(BaseModel):
+    product_id: int
+    status: Literal["added", "updated", "rejected"]
+    item: Optional[CartItem] = None
+    error: Optional[str] = None
+
+
+class CartItemBatchResponse(BaseModel):
+    cart_id: str
+    results: List[CartItemBatchResult]
+    total_items: int
+    total_amount: float
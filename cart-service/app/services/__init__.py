@@ -1,4 +1,5 @@
 from .cart_service import CartService
 from .catalog_client import CatalogClient
+from .product_cache import ProductCache, product_cache
 
-__all__ = ["CartService", "CatalogClient"]
\ No newline at end of file
+__all__ = ["CartService", "CatalogClient", "ProductCache", "product_cache"]
\ No newline at end of file
@@ -1,17 +1,20 @@
 import uuid
-from datetime import datetime
-from typing import Optional
-from sqlalchemy.orm import Session
+from typing import Any, Optional, List, Dict, Tuple
+from sqlalchemy import (
+    select, update, delete, func, cast, literal, literal_column, true, values, column, Integer, Float
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 import logging
 
 # ✅ Относительные импорты (правильно для структуры проекта)
-from ..models.cart import Cart
+from ..models.cart import Cart, CART_AMOUNT_TYPE
 from ..models.cart_item import CartItem
+from ..models.outbox import OutboxEvent
 from ..schemas.cart import CartSummary
-from ..schemas.cart_item import  CartItemCreate, CartItemUpdate
+from ..schemas.cart_item import CartItemCreate, CartItemUpdate, CartItemBatchResult, CartItemBatchResponse
 from .catalog_client import CatalogClient
-from .kafka_client import kafka_client
 
 
 # ✅ Простой logger вместо core.logger
@@ -19,177 +22,411 @@ logger = logging.getLogger(__name__)
 
 
 class CartService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.catalog_client = CatalogClient()
 
-    def get_or_create_cart(self, session_id: str) -> Cart:
+    async def get_or_create_cart(self, session_id: str) -> Cart:
         """Получить или создать корзину для сессии"""
-        cart = self.db.query(Cart).filter(Cart.id == session_id).first()
+        cart = await self.db.get(Cart, session_id)
         if not cart:
-            cart = Cart(id=session_id)
-            self.db.add(cart)
-            self.db.commit()
-            self.db.refresh(cart)
+            # ON CONFLICT DO NOTHING — параллельный запрос мог уже создать корзину
+            await self.db.execute(
+                insert(Cart).values(id=session_id).on_conflict_do_nothing(index_elements=[Cart.id])
+            )
+            await self.db.commit()
+            cart = await self.db.get(Cart, session_id)
         return cart
 
-    async def add_item(self, session_id: str, item_data: CartItemCreate) -> CartItem:
-        """Добавить товар в корзину"""
-        cart = self.get_or_create_cart(session_id)
+    @staticmethod
+    def _item_columns():
+        """Колонки позиции корзины для RETURNING"""
+        return (
+            CartItem.id,
+            CartItem.cart_id,
+            CartItem.product_id,
+            CartItem.quantity,
+            CartItem.price_at_add
+        )
 
-        # Проверяем данные товара в каталоге
-        try:
-            product = await self.catalog_client.get_product(item_data.product_id)
-            if not product:
-                raise ValueError(f"Product {item_data.product_id} not found")
+    @staticmethod
+    def _cart_totals_delta(items_delta, amount_delta) -> dict:
+        """SET-выражения для инкрементального обновления итогов корзины"""
+        return {
+            "total_items": Cart.total_items + items_delta,
+            "total_amount": Cart.total_amount + amount_delta,
+            "version": Cart.version + 1,
+            "updated_at": func.now()
+        }
 
-            if not product.get("is_active", False):
-                raise ValueError(f"Product {item_data.product_id} is not active")
+    @staticmethod
+    def _item_from_row(row) -> CartItem:
+        """Собрать CartItem из строки RETURNING"""
+        return CartItem(
+            id=row.id,
+            cart_id=row.cart_id,
+            product_id=row.product_id,
+            quantity=row.quantity,
+            price_at_add=row.price_at_add
+        )
 
-            if product.get("inventory", 0) < item_data.quantity:
-                raise ValueError(f"Insufficient inventory for product {item_data.product_id}")
-        except Exception as e:
-            logger.error(f"Error checking product {item_data.product_id}: {e}")
-            # В тестовом режиме продолжаем без проверки
-            product = {
-                "id": item_data.product_id,
-                "name": f"Product {item_data.product_id}",
-                "price": 99.99,
-                "is_active": True,
-                "inventory": 999
-            }
+    def _upsert_items_stmt(self, session_id: str, rows: List[Tuple[int, int, float]]):
+        """
+        Запрос, добавляющий позиции (product_id, quantity, price) в корзину.
+
+        Позиции, корзина и её итоги обновляются одним запросом:
+        WITH input_items AS (VALUES ...),
+             old_items AS (SELECT ...),
+             upserted_items AS (INSERT INTO cart_items ... ON CONFLICT (cart_id, product_id) DO UPDATE ... RETURNING),
+             upserted_cart AS (INSERT INTO carts ... ON CONFLICT (id) DO UPDATE SET total_* = total_* + delta RETURNING)
+        SELECT upserted_items.*, итоги корзины FROM upserted_items, upserted_cart
+
+        product_id в rows должны быть уникальны.
+        """
+        input_items = select(
+            values(
+                column("product_id", Integer),
+                column("quantity", Integer),
+                column("price", Float),
+                name="rows"
+            ).data(rows)
+        ).cte("input_items")
+
+        # Все части запроса видят один снимок, поэтому old_items — цены до upsert'а
+        old_items = (
+            select(CartItem.product_id, CartItem.price_at_add)
+            .where(
+                CartItem.cart_id == session_id,
+                CartItem.product_id.in_(select(input_items.c.product_id))
+            )
+            .cte("old_items")
+        )
 
-        # Проверяем, есть ли уже такой товар в корзине
-        existing_item = self.db.query(CartItem).filter(
-            CartItem.cart_id == cart.id,
-            CartItem.product_id == item_data.product_id
-        ).first()
-
-        if existing_item:
-            # Обновляем количество
-            old_quantity = existing_item.quantity
-            existing_item.quantity += item_data.quantity
-            existing_item.price_at_add = product["price"]
-            item = existing_item
-            action = "updated"
-        else:
-            # Создаем новый товар в корзине
-            item = CartItem(
-                cart_id=cart.id,
-                product_id=item_data.product_id,
-                quantity=item_data.quantity,
-                price_at_add=product["price"]
+        item_insert = insert(CartItem).from_select(
+            ["cart_id", "product_id", "quantity", "price_at_add"],
+            select(literal(session_id), input_items.c.product_id, input_items.c.quantity, input_items.c.price)
+        )
+        upserted_items = item_insert.on_conflict_do_update(
+            index_elements=[CartItem.cart_id, CartItem.product_id],
+            set_={
+                "quantity": CartItem.quantity + item_insert.excluded.quantity,
+                "price_at_add": item_insert.excluded.price_at_add
+            }
+        ).returning(
+            *self._item_columns(),
+            # xmax = 0 только у только что вставленной строки
+            literal_column("xmax = 0").label("inserted")
+        ).cte("upserted_items")
+
+        # Изменение суммы: новая стоимость позиции минус старая (цена могла обновиться)
+        old_price = func.coalesce(old_items.c.price_at_add, upserted_items.c.price_at_add)
+        amount_delta = func.sum(cast(
+            upserted_items.c.quantity * upserted_items.c.price_at_add
+            - (upserted_items.c.quantity - input_items.c.quantity) * old_price,
+            CART_AMOUNT_TYPE
+        ))
+        cart_insert = insert(Cart).from_select(
+            ["id", "total_items", "total_amount", "version"],
+            select(
+                literal(session_id),
+                func.sum(input_items.c.quantity),
+                amount_delta,
+                literal(1)
+            ).select_from(
+                upserted_items
+                .join(input_items, input_items.c.product_id == upserted_items.c.product_id)
+                .outerjoin(old_items, old_items.c.product_id == upserted_items.c.product_id)
+            )
+        )
+        upserted_cart = cart_insert.on_conflict_do_update(
+            index_elements=[Cart.id],
+            set_=self._cart_totals_delta(
+                cart_insert.excluded.total_items,
+                cart_insert.excluded.total_amount
             )
-            self.db.add(item)
-            action = "added"
+        ).returning(Cart.total_items, Cart.total_amount, Cart.version).cte("upserted_cart")
+
+        return select(
+            upserted_items,
+            upserted_cart.c.total_items.label("cart_total_items"),
+            upserted_cart.c.total_amount.label("cart_total_amount"),
+            upserted_cart.c.version.label("cart_version")
+        ).select_from(upserted_items.join(upserted_cart, true()))
+
+    async def _resolve_products(
+            self, quantities: Dict[int, int]
+    ) -> Tuple[Dict[int, dict], Dict[int, HTTPException]]:
+        """
+        Проверяет товары в каталоге одним пакетным запросом (общая проверка
+        add_item и add_items): (товары, прошедшие проверку; ошибки по product_id).
+        Ошибка каталога — отказ по товару, цена не подставляется.
+        """
+        lookup = await self.catalog_client.get_products(list(quantities))
+
+        products: Dict[int, dict] = {}
+        errors: Dict[int, HTTPException] = {}
+        for product_id, quantity in quantities.items():
+            product = lookup.products.get(product_id)
+
+            if product_id in lookup.failed:
+                logger.error(f"Error checking product {product_id}: {lookup.failed[product_id]}")
+                errors[product_id] = HTTPException(
+                    status_code=503, detail=f"Catalog is unavailable for product {product_id}"
+                )
+            elif not product:
+                errors[product_id] = HTTPException(status_code=404, detail=f"Product {product_id} not found")
+            elif not product.get("is_active", False):
+                errors[product_id] = HTTPException(status_code=400, detail=f"Product {product_id} is not active")
+            elif product.get("inventory", 0) < quantity:
+                errors[product_id] = HTTPException(
+                    status_code=400, detail=f"Insufficient inventory for product {product_id}"
+                )
+            else:
+                products[product_id] = product
+
+        return products, errors
+
+    async def add_item(self, session_id: str, item_data: CartItemCreate) -> CartItem:
+        """Добавить товар в корзину"""
+        # Проверяем данные товара в каталоге
+        products, errors = await self._resolve_products({item_data.product_id: item_data.quantity})
+        if errors:
+            raise errors[item_data.product_id]
+        product = products[item_data.product_id]
+
+        stmt = self._upsert_items_stmt(session_id, [(item_data.product_id, item_data.quantity, product["price"])])
 
-        self.db.commit()
-        self.db.refresh(item)
+        row = (await self.db.execute(stmt)).one()
 
-        # 🚀 Публикуем событие в Kafka
-        await self._publish_item_added_event(session_id, item, product, action)
+        item = self._item_from_row(row)
+        action = "added" if row.inserted else "updated"
+
+        # 📥 Событие пишется в outbox в той же транзакции
+        self._enqueue_item_added_event(session_id, item, product, action)
+        await self.db.commit()
 
         logger.info(f"Added item {item_data.product_id} to cart {session_id}")
         return item
 
-    async def update_item(self, session_id: str, product_id: int, item_data: CartItemUpdate) -> Optional[CartItem]:
-        """Обновить количество товара в корзине"""
-        cart = self.get_or_create_cart(session_id)
+    async def add_items(self, session_id: str, items_data: List[CartItemCreate]) -> CartItemBatchResponse:
+        """
+        Добавить несколько товаров в корзину.
 
-        item = self.db.query(CartItem).filter(
-            CartItem.cart_id == cart.id,
-            CartItem.product_id == product_id
-        ).first()
+        Все товары проверяются одним пакетным запросом к каталогу, строки
+        записываются одним запросом в одной транзакции, а в Kafka уходит одно
+        агрегированное событие. Результат возвращается по каждому товару.
+        """
+        # Одинаковые товары в запросе объединяем: ON CONFLICT не может затронуть строку дважды
+        quantities: Dict[int, int] = {}
+        for item_data in items_data:
+            quantities[item_data.product_id] = quantities.get(item_data.product_id, 0) + item_data.quantity
 
-        if not item:
-            return None
+        products, errors = await self._resolve_products(quantities)
+
+        results: Dict[int, CartItemBatchResult] = {
+            product_id: CartItemBatchResult(product_id=product_id, status="rejected", error=error.detail)
+            for product_id, error in errors.items()
+        }
+
+        cart_total_items = cart_total_amount = None
+        added_items = []
+        if products:
+            stmt = self._upsert_items_stmt(
+                session_id,
+                [(product_id, quantities[product_id], product["price"]) for product_id, product in products.items()]
+            )
+            rows = (await self.db.execute(stmt)).all()
+
+            for row in rows:
+                item = self._item_from_row(row)
+                action = "added" if row.inserted else "updated"
+                added_items.append((item, products[item.product_id], action))
+                results[item.product_id] = CartItemBatchResult(product_id=item.product_id, status=action, item=item)
+                cart_total_items, cart_total_amount = row.cart_total_items, row.cart_total_amount
 
-        old_quantity = item.quantity
+            # 📥 Одно агрегированное событие на весь пакет, в той же транзакции
+            self._enqueue_items_added_event(session_id, added_items)
+            await self.db.commit()
 
+        if cart_total_items is None:
+            summary = await self.get_cart(session_id)
+            cart_total_items, cart_total_amount = summary.total_items, summary.total_amount
+
+        logger.info(f"Added {len(added_items)}/{len(quantities)} products to cart {session_id}")
+
+        return CartItemBatchResponse(
+            cart_id=session_id,
+            results=[results[product_id] for product_id in quantities],
+            total_items=cart_total_items,
+            total_amount=cart_total_amount
+        )
+
+    async def update_item(self, session_id: str, product_id: int, item_data: CartItemUpdate) -> Optional[CartItem]:
+        """Обновить количество товара в корзине"""
         if item_data.quantity <= 0:
-            self.db.delete(item)
-            self.db.commit()
+            # Количество 0 или меньше — удаляем позицию
+            await self.remove_item(session_id, product_id)
+            return None
 
-            # 🚀 Публикуем событие удаления
-            await self._publish_item_removed_event(session_id, product_id)
+        # Данные товара для события берём до запроса, чтобы не держать блокировки во время HTTP-вызова
+        product_info = await self.catalog_client.get_product(product_id) or {}
+
+        # Позиция и итоги корзины обновляются одним запросом:
+        # WITH updated_item AS (UPDATE cart_items ... FROM (SELECT ... FOR UPDATE) RETURNING новое и старое количество)
+        # UPDATE carts SET total_* = total_* + delta FROM updated_item RETURNING updated_item.*
+        old = (
+            select(CartItem.id, CartItem.quantity)
+            .where(CartItem.cart_id == session_id, CartItem.product_id == product_id)
+            .with_for_update()
+            .subquery("old_item")
+        )
+        updated_item = (
+            update(CartItem)
+            .where(CartItem.id == old.c.id)
+            .values(quantity=item_data.quantity)
+            .returning(*self._item_columns(), old.c.quantity.label("old_quantity"))
+            .cte("updated_item")
+        )
+        quantity_delta = updated_item.c.quantity - updated_item.c.old_quantity
+        stmt = (
+            update(Cart)
+            .where(Cart.id == updated_item.c.cart_id)
+            .values(self._cart_totals_delta(
+                quantity_delta,
+                cast(quantity_delta * updated_item.c.price_at_add, CART_AMOUNT_TYPE)
+            ))
+            .returning(*updated_item.c)
+        )
+
+        row = (await self.db.execute(stmt)).one_or_none()
+
+        if row is None:
+            await self.db.rollback()
             return None
-        else:
-            item.quantity = item_data.quantity
-            self.db.commit()
-            self.db.refresh(item)
 
-            # 🚀 Публикуем событие обновления
-            await self._publish_item_updated_event(session_id, item, old_quantity)
-            return item
+        item = self._item_from_row(row)
+
+        # 📥 Событие обновления пишется в outbox в той же транзакции
+        self._enqueue_item_updated_event(session_id, item, row.old_quantity, product_info)
+        await self.db.commit()
+        return item
 
     async def remove_item(self, session_id: str, product_id: int) -> bool:
         """Удалить товар из корзины"""
-        cart = self.get_or_create_cart(session_id)
+        product_info = await self.catalog_client.get_product(product_id) or {}
+
+        # WITH deleted_item AS (DELETE ... RETURNING) UPDATE carts SET total_* = total_* - ... RETURNING
+        deleted_item = (
+            delete(CartItem)
+            .where(CartItem.cart_id == session_id, CartItem.product_id == product_id)
+            .returning(CartItem.id, CartItem.cart_id, CartItem.quantity, CartItem.price_at_add)
+            .cte("deleted_item")
+        )
+        stmt = (
+            update(Cart)
+            .where(Cart.id == deleted_item.c.cart_id)
+            .values(self._cart_totals_delta(
+                -deleted_item.c.quantity,
+                -cast(deleted_item.c.quantity * deleted_item.c.price_at_add, CART_AMOUNT_TYPE)
+            ))
+            .returning(deleted_item.c.id)
+        )
 
-        item = self.db.query(CartItem).filter(
-            CartItem.cart_id == cart.id,
-            CartItem.product_id == product_id
-        ).first()
+        deleted_id = (await self.db.execute(stmt)).scalar_one_or_none()
 
-        if item:
-            self.db.delete(item)
-            self.db.commit()
+        if deleted_id is None:
+            await self.db.rollback()
+            return False
 
-            # 🚀 Публикуем событие удаления
-            await self._publish_item_removed_event(session_id, product_id)
-            return True
-        return False
+        # 📥 Событие удаления пишется в outbox в той же транзакции
+        self._enqueue_item_removed_event(session_id, product_id, product_info)
+        await self.db.commit()
+        return True
 
-    def get_cart(self, session_id: str) -> CartSummary:
-        """Получить корзину с подсчётом итогов"""
-        cart = self.get_or_create_cart(session_id)
+    async def get_cart(self, session_id: str, include_items: bool = False) -> CartSummary:
+        """
+        Получить корзину с итогами.
 
-        items = self.db.query(CartItem).filter(CartItem.cart_id == cart.id).all()
+        Итоги хранятся в самой корзине, поэтому сводка — это поиск по первичному ключу.
+        Позиции загружаются только по запросу (include_items=True).
+        """
+        cart = await self.db.get(Cart, session_id)
+
+        if not cart:
+            return CartSummary(cart_id=session_id, total_items=0, total_amount=0.0, version=0)
 
-        total_amount = sum(item.quantity * item.price_at_add for item in items)
-        total_items = sum(item.quantity for item in items)
+        items = []
+        if include_items:
+            result = await self.db.execute(select(CartItem).where(CartItem.cart_id == cart.id))
+            items = result.scalars().all()
 
         return CartSummary(
             cart_id=session_id,
             items=items,
-            total_items=total_items,
-            total_amount=total_amount
+            total_items=cart.total_items,
+            total_amount=cart.total_amount,
+            version=cart.version
+        )
+
+    async def _drain_cart(self, session_id: str) -> list:
+        """
+        Атомарно забрать все позиции корзины и вычесть их из итогов одним запросом:
+        WITH deleted_items AS (DELETE FROM cart_items ... RETURNING),
+             drained_cart AS (UPDATE carts SET total_* = total_* - сумма удалённых ...)
+        SELECT * FROM deleted_items
+
+        Итоги уменьшаются на удалённое, а не обнуляются: позиция, добавленная
+        параллельным запросом после снимка DELETE, остаётся учтённой в итогах.
+        Возвращает снимок удалённых позиций; транзакцию фиксирует вызывающий.
+        """
+        deleted_items = (
+            delete(CartItem)
+            .where(CartItem.cart_id == session_id)
+            .returning(CartItem.product_id, CartItem.quantity, CartItem.price_at_add)
+            .cte("deleted_items")
+        )
+        removed_items = select(func.sum(deleted_items.c.quantity)).scalar_subquery()
+        removed_amount = select(
+            func.sum(cast(deleted_items.c.quantity * deleted_items.c.price_at_add, CART_AMOUNT_TYPE))
+        ).scalar_subquery()
+        drained_cart = (
+            update(Cart)
+            .where(Cart.id == session_id, select(deleted_items.c.product_id).exists())
+            .values(self._cart_totals_delta(-removed_items, -removed_amount))
+            .returning(Cart.version)
+            .cte("drained_cart")
         )
+        stmt = select(deleted_items).add_cte(drained_cart)
+
+        return (await self.db.execute(stmt)).all()
 
     async def clear_cart(self, session_id: str) -> dict:
         """Очистить корзину"""
         try:
-            cart = self.get_or_create_cart(session_id)
-
-            # Получаем количество товаров перед удалением
-            items = self.db.query(CartItem).filter(CartItem.cart_id == cart.id).all()
+            items = await self._drain_cart(session_id)
             items_count = len(items)
 
-            # Удаляем все товары из корзины
-            for item in items:
-                self.db.delete(item)
-
-            self.db.commit()
-
-            # ✅ Публикуем событие очистки корзины
-            await self._publish_cart_cleared_event(session_id, items_count)
+            # 📥 Событие очистки пишется в outbox в той же транзакции
+            self._enqueue_cart_cleared_event(session_id, items_count)
+            await self.db.commit()
 
             logger.info(f"🧹 Cart cleared for session {session_id}: {items_count} items removed")
 
             return {"message": "Cart cleared successfully"}
 
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"❌ Error clearing cart: {e}")
             raise HTTPException(status_code=500, detail=f"Error clearing cart: {str(e)}")
 
     async def checkout(self, session_id: str):
         """Оформление заказа"""
         try:
-            # Получаем корзину с товарами
-            cart_data = self.get_cart(session_id)
+            # Забираем позиции и очищаем корзину одним запросом — снимок и очистка атомарны
+            items = await self._drain_cart(session_id)
 
-            if not cart_data.items:
+            if not items:
+                await self.db.rollback()
                 raise HTTPException(status_code=400, detail="Cart is empty")
 
             # Генерируем ID заказа
@@ -197,23 +434,21 @@ class CartService:
 
             # Подготавливаем данные для события
             cart_dict = {
-                "total_amount": cart_data.total_amount,
-                "total_items": cart_data.total_items,
+                "total_amount": float(sum(item.quantity * item.price_at_add for item in items)),
+                "total_items": sum(item.quantity for item in items),
                 "items": [
                     {
                         "product_id": item.product_id,
                         "quantity": item.quantity,
                         "price_at_add": float(item.price_at_add)
                     }
-                    for item in cart_data.items
+                    for item in items
                 ]
             }
 
-            # ✅ Публикуем событие начала оформления заказа
-            await self._publish_checkout_initiated_event(session_id, order_id, cart_dict)
-
-            # Очищаем корзину после оформления
-            await self.clear_cart(session_id)
+            # 📥 Снимок корзины и событие оформления фиксируются одной транзакцией
+            self._enqueue_checkout_initiated_event(session_id, order_id, cart_dict)
+            await self.db.commit()
 
             logger.info(f"🛒 Order {order_id} created for session {session_id}")
 
@@ -223,14 +458,29 @@ class CartService:
                 "order_id": order_id
             }
 
+        except HTTPException:
+            raise
         except Exception as e:
+            await self.db.rollback()
             logger.error(f"❌ Error during checkout: {e}")
             raise HTTPException(status_code=500, detail=f"Checkout failed: {str(e)}")
 
-    # 🚀 Методы для публикации событий в Kafka
-
-    async def _publish_item_added_event(self, session_id: str, item: CartItem, product: dict, action: str):
-        """Публикация события добавления товара в корзину"""
+    # 📥 Методы для публикации событий через transactional outbox.
+    # События пишутся в таблицу outbox в транзакции изменения корзины,
+    # а в Kafka их отправляет фоновый OutboxRelay (см. events/outbox.py)
+
+    def _enqueue_event(self, topic: str, event_type: str, payload: Dict[str, Any], key: Optional[str] = None):
+        """Добавление события в outbox текущей транзакции"""
+        self.db.add(OutboxEvent(
+            event_id=str(uuid.uuid4()),
+            topic=topic,
+            event_type=event_type,
+            key=key,
+            payload=payload
+        ))
+
+    def _enqueue_item_added_event(self, session_id: str, item: CartItem, product: dict, action: str):
+        """Событие добавления товара в корзину"""
         payload = {
             "cart_id": session_id,
             "item": {
@@ -246,123 +496,117 @@ class CartService:
             "action": action  # "added" или "updated"
         }
 
-        await kafka_client.publish_event(
+        self._enqueue_event(
             topic="cart.item.added",
             event_type="item_added_to_cart",
             payload=payload,
             key=session_id
         )
 
-    async def _publish_item_updated_event(self, session_id: str, item: CartItem, old_quantity: int):
-        """Публикация события обновления товара"""
-        try:
-            product_info = await self.catalog_client.get_product(item.product_id)
-
-            payload = {
-                "cart_id": session_id,
-                "item": {
+    def _enqueue_items_added_event(self, session_id: str, added_items: List[Tuple[CartItem, dict, str]]):
+        """Агрегированное событие пакетного добавления товаров"""
+        payload = {
+            "cart_id": session_id,
+            "items": [
+                {
                     "product_id": item.product_id,
-                    "quantity": item.quantity,  # ✅ Новое количество
-                    "old_quantity": old_quantity,  # ✅ Старое количество
+                    "quantity": item.quantity,
                     "price_at_add": float(item.price_at_add),
-                    "total_price": float(item.price_at_add * item.quantity)
-                },
-                "product": {
-                    "name": product_info.get("name", f"Product {item.product_id}"),
-                    "price": product_info.get("price", float(item.price_at_add))
-                },
-                "action": "updated",
-                "change": {
-                    "from": old_quantity,
-                    "to": item.quantity,
-                    "difference": item.quantity - old_quantity
+                    "total_price": float(item.quantity * item.price_at_add),
+                    "product_name": product.get("name", f"Product {item.product_id}"),
+                    "action": action
                 }
-            }
-
-            # ✅ ИСПРАВЛЕНО: используем правильные параметры
-            await kafka_client.publish_event(
-                topic="cart.item.updated",
-                event_type="item_updated_in_cart",
-                payload=payload,
-                key=session_id
-            )
-
-            logger.info(f"📤 Published item_updated event for cart {session_id}")
-
-        except Exception as e:
-            logger.error(f"❌ Failed to publish item_updated event: {e}")
-
-    async def _publish_item_removed_event(self, session_id: str, product_id: int):
-        """Публикация события удаления товара"""
-        try:
-            product_info = await self.catalog_client.get_product(product_id)
-
-            payload = {
-                "cart_id": session_id,
-                "product_id": product_id,  # ✅ Явно указываем product_id
-                "product": {
-                    "name": product_info.get("name", f"Product {product_id}"),
-                    "price": product_info.get("price", 0.0)
-                },
-                "action": "removed"
-            }
-
-            # ✅ ИСПРАВЛЕНО: используем правильные параметры
-            await kafka_client.publish_event(
-                topic="cart.item.removed",
-                event_type="item_removed_from_cart",
-                payload=payload,
-                key=session_id
-            )
-
-            logger.info(f"📤 Published item_removed event for cart {session_id}")
+                for item, product, action in added_items
+            ],
+            "items_count": len(added_items),
+            "action": "batch_added"
+        }
 
-        except Exception as e:
-            logger.error(f"❌ Failed to publish item_removed event: {e}")
+        self._enqueue_event(
+            topic="cart.items.added",
+            event_type="items_added_to_cart",
+            payload=payload,
+            key=session_id
+        )
 
-    async def _publish_cart_cleared_event(self, session_id: str, items_count: int):
-        """Публикация события очистки корзины"""
-        try:
-            payload = {
-                "cart_id": session_id,
-                "items_removed": items_count,  # ✅ Количество удаленных товаров
-                "action": "cleared"
+    def _enqueue_item_updated_event(self, session_id: str, item: CartItem, old_quantity: int, product_info: dict):
+        """Событие обновления товара"""
+        payload = {
+            "cart_id": session_id,
+            "item": {
+                "product_id": item.product_id,
+                "quantity": item.quantity,  # ✅ Новое количество
+                "old_quantity": old_quantity,  # ✅ Старое количество
+                "price_at_add": float(item.price_at_add),
+                "total_price": float(item.price_at_add * item.quantity)
+            },
+            "product": {
+                "name": product_info.get("name", f"Product {item.product_id}"),
+                "price": product_info.get("price", float(item.price_at_add))
+            },
+            "action": "updated",
+            "change": {
+                "from": old_quantity,
+                "to": item.quantity,
+                "difference": item.quantity - old_quantity
             }
+        }
 
-            # ✅ ИСПРАВЛЕНО: используем правильные параметры
-            await kafka_client.publish_event(
-                topic="cart.cleared",
-                event_type="cart_cleared",
-                payload=payload,
-                key=session_id
-            )
+        self._enqueue_event(
+            topic="cart.item.updated",
+            event_type="item_updated_in_cart",
+            payload=payload,
+            key=session_id
+        )
 
-            logger.info(f"📤 Published cart_cleared event for cart {session_id}")
+    def _enqueue_item_removed_event(self, session_id: str, product_id: int, product_info: dict):
+        """Событие удаления товара"""
+        payload = {
+            "cart_id": session_id,
+            "product_id": product_id,  # ✅ Явно указываем product_id
+            "product": {
+                "name": product_info.get("name", f"Product {product_id}"),
+                "price": product_info.get("price", 0.0)
+            },
+            "action": "removed"
+        }
 
-        except Exception as e:
-            logger.error(f"❌ Failed to publish cart_cleared event: {e}")
+        self._enqueue_event(
+            topic="cart.item.removed",
+            event_type="item_removed_from_cart",
+            payload=payload,
+            key=session_id
+        )
 
-    async def _publish_checkout_initiated_event(self, session_id: str, order_id: str, cart_data: dict):
-        """Публикация события начала оформления заказа"""
-        try:
-            payload = {
-                "cart_id": session_id,
-                "order_id": order_id,  # ✅ ID заказа
-                "total_amount": cart_data.get("total_amount", 0.0),  # ✅ Сумма заказа
-                "total_items": cart_data.get("total_items", 0),  # ✅ Количество товаров
-                "items": cart_data.get("items", []),  # ✅ Список товаров
-                "action": "checkout_initiated"
-            }
+    def _enqueue_cart_cleared_event(self, session_id: str, items_count: int):
+        """Событие очистки корзины"""
+        payload = {
+            "cart_id": session_id,
+            "items_removed": items_count,  # ✅ Количество удаленных товаров
+            "action": "cleared"
+        }
 
-            # ✅ ИСПРАВЛЕНО: используем правильные параметры
-            await kafka_client.publish_event(
-                topic="cart.checkout.initiated",
-                event_type="checkout_initiated",
-                payload=payload,
-                key=session_id
-            )
+        self._enqueue_event(
+            topic="cart.cleared",
+            event_type="cart_cleared",
+            payload=payload,
+            key=session_id
+        )
 
-            logger.info(f"📤 Published checkout_initiated event for order {order_id}")
+    def _enqueue_checkout_initiated_event(self, session_id: str, order_id: str, cart_data: dict):
+        """Событие начала оформления заказа"""
+        payload = {
+            "cart_id": session_id,
+            "order_id": order_id,  # ✅ ID заказа
+            "total_amount": cart_data.get("total_amount", 0.0),  # ✅ Сумма заказа
+            "total_items": cart_data.get("total_items", 0),  # ✅ Количество товаров
+            "items": cart_data.get("items", []),  # ✅ Список товаров
+            "action": "checkout_initiated"
+        }
 
-        except Exception as e:
-            logger.error(f"❌ Failed to publish checkout_initiated event: {e}")
+        self._enqueue_event(
+            topic="cart.checkout.initiated",
+            event_type="checkout_initiated",
+            payload=payload,
+            key=session_id
+        )
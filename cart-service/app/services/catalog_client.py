@@ -1,37 +1,167 @@
+import asyncio
 import httpx
 import logging
-from typing import Optional, Dict, Any
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
 
 from ..config import settings
+from .product_cache import product_cache
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ProductLookupResult:
+    """Результат пакетного запроса товаров с разбивкой по каждому товару"""
+    products: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    not_found: List[int] = field(default_factory=list)
+    failed: Dict[int, str] = field(default_factory=dict)  # product_id -> причина ошибки
+
+
 class CatalogClient:
     """Клиент для взаимодействия с Catalog Service"""
 
+    # Поддерживает ли каталог batch-endpoint (None — ещё не проверяли)
+    _batch_supported: Optional[bool] = None
+
+    # Общий на процесс HTTP-клиент с пулом keep-alive соединений.
+    # Открывается и закрывается в lifespan приложения (см. main.py)
+    _http: Optional[httpx.AsyncClient] = None
+
     def __init__(self):
         self.base_url = settings.catalog_service_url
-        self.timeout = 5.0
+        self.timeout = settings.catalog_timeout
+
+    @classmethod
+    async def start(cls):
+        """Создание общего пула соединений"""
+        if cls._http is None:
+            cls._http = cls._create_http_client()
+            logger.info(
+                f"✅ Catalog HTTP client started "
+                f"(max_connections={settings.catalog_max_connections}, http2={settings.catalog_http2})"
+            )
+
+    @classmethod
+    async def stop(cls):
+        """Закрытие общего пула соединений"""
+        if cls._http is not None:
+            http, cls._http = cls._http, None
+            await http.aclose()
+            logger.info("✅ Catalog HTTP client stopped")
+
+    @staticmethod
+    def _create_http_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=settings.catalog_service_url,
+            timeout=settings.catalog_timeout,
+            limits=httpx.Limits(
+                max_connections=settings.catalog_max_connections,
+                max_keepalive_connections=settings.catalog_max_keepalive_connections,
+                keepalive_expiry=settings.catalog_keepalive_expiry
+            ),
+            http2=settings.catalog_http2
+        )
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Общий клиент; создаётся лениво, если lifespan ещё не запускался"""
+        if CatalogClient._http is None:
+            CatalogClient._http = self._create_http_client()
+        return CatalogClient._http
 
     async def get_product(self, product_id: int) -> Optional[Dict[str, Any]]:
-        """Получить информацию о товаре"""
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/products/{product_id}")
-
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 404:
-                    logger.warning(f"Product {product_id} not found")
-                    return None
+        """Получить информацию о товаре (сначала из кэша)"""
+        product = product_cache.get(product_id)
+        if product is not None:
+            return product
+
+        product, error = await self._fetch_one(product_id)
+        if error:
+            logger.error(f"Error fetching product {product_id}: {error}")
+        elif product is None:
+            logger.warning(f"Product {product_id} not found")
+        return product
+
+    async def get_products(self, product_ids: list[int]) -> ProductLookupResult:
+        """
+        Пакетно получить товары: сначала из кэша, остальные — batch-запросом
+        к каталогу (если endpoint есть) или одиночными запросами с ограниченной параллельностью.
+        """
+        result = ProductLookupResult()
+        missing = []
+
+        for product_id in dict.fromkeys(product_ids):
+            product = product_cache.get(product_id)
+            if product is not None:
+                result.products[product_id] = product
+            else:
+                missing.append(product_id)
+
+        if missing and settings.catalog_batch_path and CatalogClient._batch_supported is not False:
+            missing = await self._fetch_batch(missing, result)
+
+        if missing:
+            semaphore = asyncio.Semaphore(settings.catalog_max_concurrency)
+
+            async def lookup(product_id: int):
+                async with semaphore:
+                    return await self._fetch_one(product_id)
+
+            for product_id, (product, error) in zip(missing, await asyncio.gather(*(lookup(pid) for pid in missing))):
+                if product is not None:
+                    result.products[product_id] = product
+                elif error:
+                    result.failed[product_id] = error
                 else:
-                    logger.error(f"Error fetching product {product_id}: {response.status_code}")
-                    return None
+                    result.not_found.append(product_id)
+
+        return result
+
+    async def _fetch_batch(self, product_ids: list[int], result: ProductLookupResult) -> list[int]:
+        """Batch-запрос к каталогу; возвращает ID, которые нужно догрузить по одному"""
+        try:
+            response = await self.http.get(
+                settings.catalog_batch_path,
+                params={"ids": ",".join(str(pid) for pid in product_ids)}
+            )
+
+            if response.status_code in (404, 405, 501):
+                CatalogClient._batch_supported = False
+                logger.info("Catalog batch endpoint is not available, using per-product requests")
+                return product_ids
+
+            response.raise_for_status()
+            CatalogClient._batch_supported = True
+
+            data = response.json()
+            for product in data.get("products", []) if isinstance(data, dict) else data:
+                if product.get("id") in product_ids:
+                    result.products[product["id"]] = product
+                    product_cache.set(product["id"], product)
+
+            result.not_found.extend(pid for pid in product_ids if pid not in result.products)
+            return []
+
+        except Exception as e:
+            logger.error(f"Error fetching products batch: {e}")
+            return product_ids
+
+    async def _fetch_one(self, product_id: int):
+        """Одиночный запрос: (товар, None) | (None, None) — не найден | (None, ошибка)"""
+        try:
+            response = await self.http.get(f"/products/{product_id}")
+
+            if response.status_code == 200:
+                product = response.json()
+                product_cache.set(product_id, product)
+                return product, None
+            elif response.status_code == 404:
+                return None, None
+            else:
+                return None, f"HTTP {response.status_code}"
 
         except httpx.TimeoutException:
-            logger.error(f"Timeout when fetching product {product_id}")
-            return None
+            return None, "timeout"
         except Exception as e:
-            logger.error(f"Error fetching product {product_id}: {e}")
-            return None
\ No newline at end of file
+            return None, str(e)
@@ -1,34 +1,57 @@
-import json
+import asyncio
 import logging
 import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple, Callable, Set
 from aiokafka import AIOKafkaProducer
+from aiokafka.structs import RecordMetadata
 from aiokafka.errors import KafkaConnectionError, KafkaTimeoutError
 
+from shared.utils.kafka_utils import encode_event, get_codec
+
 from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+# Колбэк доставки: (metadata, error) — ровно одно из значений не None
+DeliveryCallback = Callable[[Optional[RecordMetadata], Optional[Exception]], None]
+
 
 class KafkaClient:
-    """Kafka клиент для отправки событий из cart-service"""
+    """
+    Kafka клиент для отправки событий из cart-service.
+
+    В режиме async delivery (settings.kafka_async_delivery) publish_event
+    только ставит сообщение в очередь продюсера и сразу возвращается;
+    результат доставки приходит в колбэк и метрики. Сообщения накапливаются
+    в пакеты (linger_ms / max_batch_size) и сжимаются целиком.
+    """
 
     def __init__(self):
         self.producer: Optional[AIOKafkaProducer] = None
         self.bootstrap_servers = settings.kafka_bootstrap_servers
+        self.async_delivery = settings.kafka_async_delivery
+        self.codec = get_codec(settings.kafka_codec)
+        self._pending: Set[asyncio.Future] = set()
+
+        # Метрики доставки
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed = 0
 
     async def start_producer(self):
         """Запуск Kafka продюсера"""
         try:
             self.producer = AIOKafkaProducer(
                 bootstrap_servers=self.bootstrap_servers,
-                value_serializer=lambda v: json.dumps(v).encode('utf-8'),
                 key_serializer=lambda k: k.encode('utf-8') if k else None,
                 retry_backoff_ms=1000,
                 request_timeout_ms=30000,
                 acks='all',
-                enable_idempotence=True
+                enable_idempotence=True,
+                linger_ms=settings.kafka_linger_ms,
+                max_batch_size=settings.kafka_max_batch_size,
+                compression_type=settings.kafka_compression_type
             )
             await self.producer.start()
             logger.info("✅ Kafka producer started successfully")
@@ -40,45 +63,177 @@ class KafkaClient:
         """Остановка Kafka продюсера"""
         if self.producer:
             try:
+                await self.flush()
                 await self.producer.stop()
                 logger.info("✅ Kafka producer stopped")
             except Exception as e:
                 logger.error(f"❌ Error stopping Kafka producer: {e}")
 
+    @staticmethod
+    def build_event(
+            event_type: str,
+            payload: Dict[str, Any],
+            event_id: Optional[str] = None,
+            event_timestamp: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Стандартная обёртка события"""
+        return {
+            "event_id": event_id or str(uuid.uuid4()),
+            "event_type": event_type,
+            "event_timestamp": (event_timestamp or datetime.utcnow()).isoformat(),
+            "producer_service": "cart-service",
+            "payload": payload
+        }
+
     async def publish_event(
             self,
             topic: str,
             event_type: str,
             payload: Dict[str, Any],
-            key: Optional[str] = None
+            key: Optional[str] = None,
+            wait: Optional[bool] = None,
+            on_delivery: Optional[DeliveryCallback] = None
     ) -> bool:
-        """Публикация события в Kafka"""
+        """
+        Публикация события в Kafka.
+
+        wait=True — дождаться подтверждения брокера (acks=all) перед возвратом;
+        по умолчанию ждём только если async delivery выключен. Без ожидания
+        True означает, что событие принято в очередь продюсера, а итог
+        доставки передаётся в on_delivery.
+        """
         if not self.producer:
             logger.error("Kafka producer not started")
             return False
 
+        if wait is None:
+            wait = not self.async_delivery
+
         try:
-            event = {
-                "event_id": str(uuid.uuid4()),
-                "event_type": event_type,
-                "event_timestamp": datetime.utcnow().isoformat(),
-                "producer_service": "cart-service",
-                "payload": payload
-            }
-
-            future = await self.producer.send(topic, value=event, key=key)
-            record_metadata = await future
+            value, headers = encode_event(self.build_event(event_type, payload), self.codec)
+            future = await self.producer.send(topic, value=value, key=key, headers=headers)
+            self.enqueued += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"❌ Error publishing event {event_type} to {topic}: {e}")
+            if on_delivery:
+                on_delivery(None, e)
+            return False
 
-            logger.info(
-                f"✅ Event published: {event_type} to {topic} "
-                f"(partition: {record_metadata.partition}, offset: {record_metadata.offset})"
+        if not wait:
+            self._pending.add(future)
+            future.add_done_callback(
+                lambda f: self._on_delivery(f, topic, event_type, on_delivery)
             )
             return True
 
+        try:
+            record_metadata = await future
         except Exception as e:
+            self.failed += 1
             logger.error(f"❌ Error publishing event {event_type} to {topic}: {e}")
+            if on_delivery:
+                on_delivery(None, e)
             return False
 
+        self.delivered += 1
+        logger.info(
+            f"✅ Event published: {event_type} to {topic} "
+            f"(partition: {record_metadata.partition}, offset: {record_metadata.offset})"
+        )
+        if on_delivery:
+            on_delivery(record_metadata, None)
+        return True
+
+    def _on_delivery(
+            self,
+            future: asyncio.Future,
+            topic: str,
+            event_type: str,
+            on_delivery: Optional[DeliveryCallback]
+    ):
+        """Обработка результата асинхронной доставки"""
+        self._pending.discard(future)
+
+        if future.cancelled():
+            error, record_metadata = asyncio.CancelledError(), None
+        else:
+            error, record_metadata = future.exception(), None
+            if error is None:
+                record_metadata = future.result()
+
+        if error is None:
+            self.delivered += 1
+            logger.debug(
+                f"✅ Event delivered: {event_type} to {topic} "
+                f"(partition: {record_metadata.partition}, offset: {record_metadata.offset})"
+            )
+        else:
+            self.failed += 1
+            logger.error(f"❌ Error delivering event {event_type} to {topic}: {error}")
+
+        if on_delivery:
+            try:
+                on_delivery(record_metadata, error)
+            except Exception as e:
+                logger.error(f"❌ Delivery callback failed for {event_type}: {e}")
+
+    async def flush(self):
+        """Отправляет накопленные пакеты и дожидается всех подтверждений"""
+        if not self.producer:
+            return
+
+        await self.producer.flush()
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики продюсера"""
+        return {
+            "status": "running" if self.producer else "stopped",
+            "async_delivery": self.async_delivery,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "pending": len(self._pending)
+        }
+
+    async def publish_batch(
+            self,
+            records: List[Tuple[str, Dict[str, Any], Optional[str]]]
+    ) -> List[Optional[Exception]]:
+        """
+        Пакетная публикация готовых событий (topic, event, key).
+
+        Все сообщения ставятся в очередь продюсера до ожидания подтверждений,
+        поэтому они уходят общими батчами (linger_ms/compression).
+        Возвращает результат по каждой записи: None — доставлено, иначе ошибка.
+        """
+        if not self.producer:
+            raise RuntimeError("Kafka producer not started")
+
+        results: List[Optional[Exception]] = [None] * len(records)
+        pending = []
+
+        for i, (topic, event, key) in enumerate(records):
+            try:
+                value, headers = encode_event(event, self.codec)
+                pending.append((i, await self.producer.send(topic, value=value, key=key, headers=headers)))
+                self.enqueued += 1
+            except Exception as e:
+                results[i] = e
+
+        delivered = await asyncio.gather(*(future for _, future in pending), return_exceptions=True)
+        for (i, _), outcome in zip(pending, delivered):
+            if isinstance(outcome, BaseException):
+                results[i] = outcome
+
+        failed = sum(1 for error in results if error is not None)
+        self.failed += failed
+        self.delivered += len(records) - failed
+
+        return results
+
 
 # Глобальный экземпляр клиента
 kafka_client = KafkaClient()
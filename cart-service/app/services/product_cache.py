@@ -0,0 +1,100 @@
+import time
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProductCache:
+    """
+    In-process кэш товаров из catalog-service.
+
+    Ограничен по размеру (LRU-вытеснение) и по времени жизни записи (TTL).
+    Актуальность поддерживается событиями каталога, которые каждый экземпляр
+    сервиса читает сам (см. ProductCacheInvalidator), поэтому TTL может быть длинным.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        # Метрики
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """Получить товар из кэша (None при промахе или истёкшей записи)"""
+        entry = self._entries.get(product_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, product = entry
+        if expires_at <= time.monotonic():
+            del self._entries[product_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(product_id)
+        self.hits += 1
+        return product
+
+    def set(self, product_id: int, product: Dict[str, Any]):
+        """Положить товар в кэш, вытесняя самые давно использованные записи"""
+        self._entries[product_id] = (time.monotonic() + self.ttl_seconds, product)
+        self._entries.move_to_end(product_id)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, product_id: int, changes: Dict[str, Any]) -> bool:
+        """Обновить поля закэшированного товара, не сбрасывая запись"""
+        entry = self._entries.get(product_id)
+        if entry is None:
+            return False
+
+        expires_at, product = entry
+        self._entries[product_id] = (expires_at, {**product, **changes})
+        return True
+
+    def invalidate(self, product_id: int) -> bool:
+        """Удалить товар из кэша"""
+        if self._entries.pop(product_id, None) is None:
+            return False
+        self.invalidations += 1
+        return True
+
+    def clear(self):
+        """Полностью очистить кэш"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики кэша"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+
+# Глобальный экземпляр кэша
+product_cache = ProductCache(
+    max_size=settings.product_cache_max_size,
+    ttl_seconds=settings.product_cache_ttl_seconds
+)
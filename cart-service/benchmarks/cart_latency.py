@@ -0,0 +1,78 @@
+"""
+Нагрузочный бенчмарк задержек cart-service.
+
+Запускает N конкурентных клиентов, которые чередуют POST /cart/items и GET /cart,
+и печатает p50/p95/p99 задержки и пропускную способность.
+
+Пример (до и после изменения — на одном и том же стенде):
+    python benchmarks/cart_latency.py --url http://localhost:8001 --concurrency 50 --requests 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Перцентиль по отсортированной выборке"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+async def worker(client: httpx.AsyncClient, queue: asyncio.Queue, latencies: list[float], errors: list[int]):
+    """Клиент, выполняющий запросы из общей очереди"""
+    while True:
+        try:
+            i = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        started = time.perf_counter()
+        try:
+            if i % 2 == 0:
+                response = await client.post("/api/v1/cart/items", json={"product_id": 1 + i % 5, "quantity": 1})
+            else:
+                response = await client.get("/api/v1/cart")
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError:
+            errors.append(0)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def run(url: str, concurrency: int, total: int):
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    latencies: list[float] = []
+    errors: list[int] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=30.0, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, queue, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"requests:    {len(latencies)} ({len(errors)} errors)")
+    print(f"concurrency: {concurrency}")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} req/s")
+    print(f"mean:        {statistics.mean(latencies):.2f} ms")
+    print(f"p50:         {percentile(latencies, 50):.2f} ms")
+    print(f"p95:         {percentile(latencies, 95):.2f} ms")
+    print(f"p99:         {percentile(latencies, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cart-service latency benchmark")
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.concurrency, args.requests))
@@ -0,0 +1,123 @@
+"""
+Бенчмарк CartService.add_item (req/s) с каталогом-заглушкой wiremock
+(wiremock/mappings/products.json) и настоящей базой cart-service.
+
+Сравнивает два режима на одном и том же стенде:
+  * per-request — новый httpx.AsyncClient на каждую проверку товара (поведение до пула соединений);
+  * pooled      — общий CatalogClient с keep-alive пулом.
+
+В обоих режимах product_cache отключён: каждый add_item проверяет товар
+в каталоге, как при холодном кэше, иначе после первых 100 ID измерялись бы
+попадания в кэш, а не переиспользование соединений.
+
+Корзины бенчмарка (bench-*) удаляются после прогона; события item_added
+остаются в outbox, поэтому запускайте на отдельной базе с применёнными миграциями.
+
+Пример:
+    docker run --rm -p 8080:8080 -v $PWD/wiremock:/home/wiremock wiremock/wiremock --global-response-templating
+    CATALOG_SERVICE_URL=http://localhost:8080 DATABASE_URL=postgresql+asyncpg://... \\
+        python benchmarks/catalog_client.py --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from sqlalchemy import delete
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path[:0] = [SERVICE_DIR, os.path.dirname(SERVICE_DIR)]
+
+from app.config import settings  # noqa: E402
+from app.database import AsyncSessionLocal, engine  # noqa: E402
+from app.models.cart import Cart  # noqa: E402
+from app.models.cart_item import CartItem  # noqa: E402
+from app.schemas.cart_item import CartItemCreate  # noqa: E402
+from app.services.cart_service import CartService  # noqa: E402
+from app.services.catalog_client import CatalogClient  # noqa: E402
+from app.services.product_cache import product_cache  # noqa: E402
+
+CARTS = 1000
+PRODUCTS = 100
+
+
+class PerRequestCatalogClient(CatalogClient):
+    """Старое поведение: отдельное соединение на каждый запрос к каталогу"""
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        return self._request_http
+
+    async def _fetch_one(self, product_id: int):
+        async with httpx.AsyncClient(base_url=settings.catalog_service_url, timeout=settings.catalog_timeout) as client:
+            self._request_http = client
+            return await super()._fetch_one(product_id)
+
+
+async def add_item(mode: str, catalog_client_class, i: int) -> bool:
+    """Один запрос POST /cart/items без HTTP-слоя cart-service"""
+    async with AsyncSessionLocal() as db:
+        service = CartService(db)
+        service.catalog_client = catalog_client_class()
+        try:
+            await service.add_item(
+                f"bench-{mode}-{i % CARTS}",
+                CartItemCreate(product_id=1 + i % PRODUCTS, quantity=1)
+            )
+            return True
+        except Exception:
+            return False
+
+
+async def measure(mode: str, catalog_client_class, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            return await add_item(mode, catalog_client_class, i)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    failed = sum(1 for ok in results if not ok)
+    print(f"{mode:<11} {total / elapsed:>10.1f} req/s  ({elapsed:.2f}s, {failed} failed)")
+
+
+async def cleanup():
+    """Удаляет корзины бенчмарка"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(CartItem).where(CartItem.cart_id.like("bench-%")))
+        await db.execute(delete(Cart).where(Cart.id.like("bench-%")))
+        await db.commit()
+
+
+async def run(total: int, concurrency: int):
+    print(f"catalog: {settings.catalog_service_url}, requests: {total}, concurrency: {concurrency}")
+
+    # Каждая проверка товара идёт в каталог; заглушка обслуживает только /products/{id}
+    product_cache.get = lambda product_id: None
+    CatalogClient._batch_supported = False
+
+    try:
+        await measure("per-request", PerRequestCatalogClient, total, concurrency)
+
+        await CatalogClient.start()
+        try:
+            await measure("pooled", CatalogClient, total, concurrency)
+        finally:
+            await CatalogClient.stop()
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CartService.add_item catalog connection pooling benchmark")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.requests, args.concurrency))
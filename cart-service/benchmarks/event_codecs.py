@@ -0,0 +1,92 @@
+"""
+Микробенчмарк кодеков событий Kafka (shared.utils.kafka_utils).
+
+Кодирует и декодирует события cart.checkout.initiated в том виде, в каком их
+отправляет OutboxRelay, и печатает пропускную способность (событий/с) и
+размер сообщения для каждого доступного кодека.
+
+Пример (из корня репозитория):
+    python cart-service/benchmarks/event_codecs.py --items 20 --iterations 20000
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from shared.utils.kafka_utils import get_codec  # noqa: E402
+
+CODECS = ["stdlib-json", "json", "msgpack"]
+
+
+def checkout_event(items: int) -> dict:
+    """Событие оформления заказа с заданным числом позиций"""
+    cart_items = [
+        {
+            "product_id": random.randint(1, 100000),
+            "quantity": random.randint(1, 5),
+            "price_at_add": round(random.uniform(1, 500), 2)
+        }
+        for _ in range(items)
+    ]
+    session_id = f"session_{uuid.uuid4().hex}"
+    return {
+        "event_id": str(uuid.uuid4()),
+        "event_type": "checkout_initiated",
+        "event_timestamp": datetime.utcnow().isoformat(),
+        "producer_service": "cart-service",
+        "payload": {
+            "cart_id": session_id,
+            "order_id": f"ORDER-{session_id}",
+            "total_amount": round(sum(i["quantity"] * i["price_at_add"] for i in cart_items), 2),
+            "total_items": sum(i["quantity"] for i in cart_items),
+            "items": cart_items,
+            "action": "checkout_initiated"
+        }
+    }
+
+
+def measure(fn, values: list, iterations: int) -> float:
+    """Операций в секунду"""
+    count = len(values)
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(values[i % count])
+    return iterations / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event codec microbenchmark")
+    parser.add_argument("--items", type=int, default=20, help="Позиций в корзине")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=100, help="Различных событий в выборке")
+    args = parser.parse_args()
+
+    events = [checkout_event(args.items) for _ in range(args.events)]
+
+    print(f"checkout_initiated, {args.items} items, {args.iterations} iterations")
+    print(f"{'codec':<12} {'encode/s':>12} {'decode/s':>12} {'bytes':>8}")
+
+    for name in CODECS:
+        try:
+            codec = get_codec(name)
+        except RuntimeError as e:
+            print(f"{name:<12} skipped: {e}")
+            continue
+
+        encoded = [codec.encode(event) for event in events]
+        assert codec.decode(encoded[0]) == events[0]
+
+        encode_rate = measure(codec.encode, events, args.iterations)
+        decode_rate = measure(codec.decode, encoded, args.iterations)
+        size = sum(len(value) for value in encoded) // len(encoded)
+
+        print(f"{name:<12} {encode_rate:>12,.0f} {decode_rate:>12,.0f} {size:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Сервис импортируется как пакет app, общие утилиты — из корня репозитория (shared)
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(SERVICE_DIR), str(SERVICE_DIR.parent)]
@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.events import outbox as outbox_module
+from app.events.outbox import OutboxRelay, split_by_key_order
+from app.models.outbox import OutboxEvent
+
+
+def make_event(event_id: int, key, topic: str = "cart.events") -> OutboxEvent:
+    return OutboxEvent(
+        id=event_id,
+        event_id=f"event-{event_id}",
+        topic=topic,
+        event_type="item_added",
+        key=key,
+        payload={"n": event_id},
+        created_at=datetime(2026, 10, 17)
+    )
+
+
+class FakeKafka:
+    """publish_batch, который не доставляет заданные события"""
+
+    def __init__(self, failing_event_ids):
+        self.failing_event_ids = set(failing_event_ids)
+        self.batches = []
+
+    def build_event(self, event_type, payload, event_id=None, event_timestamp=None):
+        return {"event_id": event_id, "event_type": event_type, "payload": payload}
+
+    async def publish_batch(self, records):
+        self.batches.append([event["event_id"] for _, event, _ in records])
+        return [
+            RuntimeError("broker unavailable") if event["event_id"] in self.failing_event_ids else None
+            for _, event, _ in records
+        ]
+
+
+@pytest.fixture
+def fake_kafka(monkeypatch):
+    def install(failing_event_ids=()):
+        kafka = FakeKafka(failing_event_ids)
+        monkeypatch.setattr(outbox_module, "kafka_client", kafka)
+        return kafka
+    return install
+
+
+def test_split_by_key_order_puts_nth_event_of_each_key_into_nth_wave():
+    events = [
+        make_event(1, "cart-a"),
+        make_event(2, "cart-b"),
+        make_event(3, "cart-a"),
+        make_event(4, None),
+        make_event(5, "cart-a"),
+        make_event(6, None),
+        make_event(7, "cart-a", topic="cart.other"),
+    ]
+
+    waves = split_by_key_order(events)
+
+    assert [[event.id for event in wave] for wave in waves] == [[1, 2, 4, 6, 7], [3], [5]]
+
+
+def test_failed_event_blocks_later_events_of_same_key(fake_kafka):
+    kafka = fake_kafka(failing_event_ids={"event-1"})
+    events = [
+        make_event(1, "cart-a"),
+        make_event(2, "cart-b"),
+        make_event(3, "cart-a"),
+        make_event(4, "cart-b"),
+        make_event(5, "cart-a"),
+    ]
+
+    outcomes = asyncio.run(OutboxRelay().publish_in_key_order(events))
+
+    # Событие 1 не доставлено: 3 и 5 не публикуются и не получают результата
+    assert kafka.batches == [["event-1", "event-2"], ["event-4"]]
+    assert {event.id: error is None for event, error in outcomes.items()} == {1: False, 2: True, 4: True}
+
+
+def test_events_without_key_are_not_blocked_by_failures(fake_kafka):
+    kafka = fake_kafka(failing_event_ids={"event-1"})
+    events = [make_event(1, None), make_event(2, None)]
+
+    outcomes = asyncio.run(OutboxRelay().publish_in_key_order(events))
+
+    assert kafka.batches == [["event-1", "event-2"]]
+    assert {event.id: error is None for event, error in outcomes.items()} == {1: False, 2: True}
@@ -10,13 +10,21 @@ class Settings(BaseSettings):
     kafka_bootstrap_servers: str = "localhost:9092"
     kafka_group_id: str = "notification-service"
     kafka_auto_offset_reset: str = "earliest"
+    kafka_max_in_flight_per_partition: int = 10  # Параллельная обработка разных ключей партиции
+    kafka_max_buffered_per_partition: int = 1000  # Выше — партиция ставится на паузу
+    # Ручной коммит offset'ов: каждые N обработанных сообщений или T мс
+    kafka_commit_every_messages: int = 100
+    kafka_commit_interval_ms: int = 5000
 
     # Топики для подписки
     kafka_topics: List[str] = [
         "cart.item.added",
+        "cart.items.added",
         "cart.item.updated",
         "cart.item.removed",
         "cart.cleared",
+        "cart.prices.updated",
+        "cart.product.unavailable",
         "cart.checkout.initiated"
     ]
 
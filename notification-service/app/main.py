@@ -25,9 +25,12 @@ async def lifespan(app: FastAPI):
         # Регистрируем обработчики событий
         logger.info("📋 Registering event handlers...")
         kafka_consumer.register_handler("item_added_to_cart", CartEventHandlers.handle_item_added)
+        kafka_consumer.register_handler("items_added_to_cart", CartEventHandlers.handle_items_added)
         kafka_consumer.register_handler("item_updated_in_cart", CartEventHandlers.handle_item_updated)
         kafka_consumer.register_handler("item_removed_from_cart", CartEventHandlers.handle_item_removed)
         kafka_consumer.register_handler("cart_cleared", CartEventHandlers.handle_cart_cleared)
+        kafka_consumer.register_handler("cart_prices_updated", CartEventHandlers.handle_prices_updated)
+        kafka_consumer.register_handler("cart_product_unavailable", CartEventHandlers.handle_product_unavailable)
         kafka_consumer.register_handler("checkout_initiated", CartEventHandlers.handle_checkout_initiated)
 
         # Запускаем Kafka consumer
@@ -109,6 +112,8 @@ async def get_stats():
     return {
         "consumer_status": "running" if kafka_consumer.running else "stopped",
         "registered_handlers": list(kafka_consumer.handlers.keys()),
+        "skipped_events": kafka_consumer.skipped,
+        "partitions": kafka_consumer.engine.stats() if kafka_consumer.engine else {},
         "subscribed_topics": settings.kafka_topics
     }
 
@@ -1,10 +1,12 @@
-import json
 import logging
 import asyncio
-from typing import Dict, Any, List, Callable
+from typing import Dict, Any, List, Callable, Optional
 from aiokafka import AIOKafkaConsumer
 from aiokafka.errors import KafkaConnectionError, KafkaTimeoutError
 
+from shared.utils.consumer_engine import PartitionedConsumerEngine
+from shared.utils.kafka_utils import decode_event, get_event_type
+
 from ...config import settings
 
 logger = logging.getLogger(__name__)
@@ -17,17 +19,28 @@ class KafkaEventConsumer:
         self.consumer = None
         self.handlers: Dict[str, List[Callable]] = {}
         self.running = False
+        self.skipped = 0  # События без обработчика, отброшенные по заголовку
+        self.engine: Optional[PartitionedConsumerEngine] = None
 
     async def start(self):
         """Запуск Kafka Consumer"""
         try:
             self.consumer = AIOKafkaConsumer(
-                *settings.kafka_topics,
                 bootstrap_servers=settings.kafka_bootstrap_servers,
                 group_id=settings.kafka_group_id,
                 auto_offset_reset=settings.kafka_auto_offset_reset,
-                value_deserializer=lambda m: json.loads(m.decode('utf-8'))
+                enable_auto_commit=False  # Коммитит PartitionedConsumerEngine
+            )
+            self.engine = PartitionedConsumerEngine(
+                self.consumer,
+                self._process_message,
+                max_in_flight=settings.kafka_max_in_flight_per_partition,
+                max_buffered=settings.kafka_max_buffered_per_partition,
+                commit_every=settings.kafka_commit_every_messages,
+                commit_interval_ms=settings.kafka_commit_interval_ms
             )
+            # Listener коммитит обработанное перед отзывом партиций при ребалансировке
+            self.consumer.subscribe(settings.kafka_topics, listener=self.engine.rebalance_listener())
 
             await self.consumer.start()
             logger.info(f"✅ Kafka consumer started for topics: {settings.kafka_topics}")
@@ -39,6 +52,8 @@ class KafkaEventConsumer:
     async def stop(self):
         """Остановка Kafka Consumer"""
         self.running = False
+        if self.engine:
+            await self.engine.stop()
         if self.consumer:
             try:
                 await self.consumer.stop()
@@ -54,7 +69,7 @@ class KafkaEventConsumer:
         logger.info(f"✅ Registered handler for event type: {event_type}")
 
     async def consume_events(self):
-        """Основной цикл потребления событий"""
+        """Основной цикл потребления событий: партиции обрабатываются параллельно"""
         if not self.consumer:
             raise RuntimeError("Consumer not started")
 
@@ -62,32 +77,30 @@ class KafkaEventConsumer:
         logger.info("🔄 Starting event consumption...")
 
         try:
-            async for message in self.consumer:
-                if not self.running:
-                    break
-
-                try:
-                    # Извлекаем данные события
-                    event_data = message.value
-                    topic = message.topic
-                    partition = message.partition
-                    offset = message.offset
+            await self.engine.run()
+        except Exception as e:
+            logger.error(f"❌ Error in consume loop: {e}")
+            raise
 
-                    logger.info(
-                        f"📨 Received event: {event_data.get('event_type')} "
-                        f"from {topic} (partition: {partition}, offset: {offset})"
-                    )
+    async def _process_message(self, message):
+        """Обработка одной записи Kafka"""
+        # Маршрутизация по заголовку: без обработчика значение не декодируем
+        header_type = get_event_type(message.headers)
+        if header_type is not None and header_type not in self.handlers:
+            self.skipped += 1
+            logger.debug(f"⏭️ Skipping {header_type} from {message.topic}: no handlers registered")
+            return
 
-                    # Обрабатываем событие
-                    await self._process_event(event_data, topic)
+        # Извлекаем данные события
+        event_data = decode_event(message.value, message.headers)
 
-                except Exception as e:
-                    logger.error(f"❌ Error processing message: {e}")
-                    # В production здесь можно добавить логику retry или DLQ
+        logger.info(
+            f"📨 Received event: {event_data.get('event_type')} "
+            f"from {message.topic} (partition: {message.partition}, offset: {message.offset})"
+        )
 
-        except Exception as e:
-            logger.error(f"❌ Error in consume loop: {e}")
-            raise
+        # Обрабатываем событие
+        await self._process_event(event_data, message.topic)
 
     async def _process_event(self, event_data: Dict[str, Any], topic: str):
         """Обработка отдельного события"""
@@ -34,6 +34,23 @@ class CartEventHandlers:
         # Обновляем аналитику
         await CartEventHandlers._update_analytics("item_added", payload)
 
+    @staticmethod
+    async def handle_items_added(event_data: Dict[str, Any]):
+        """Обработка пакетного добавления товаров в корзину"""
+        payload = event_data.get('payload', {})
+        cart_id = payload.get('cart_id')
+        items = payload.get('items', [])
+
+        logger.info(f"🛍️ {len(items)} items added to cart {cart_id}")
+
+        await CartEventHandlers._send_notification(
+            cart_id=cart_id,
+            event_type="items_added",
+            message=f"В корзину добавлено товаров: {len(items)}"
+        )
+
+        await CartEventHandlers._update_analytics("items_added", payload)
+
     @staticmethod
     async def handle_item_updated(event_data: Dict[str, Any]):
         """Обработка обновления товара в корзине"""
@@ -91,6 +108,48 @@ class CartEventHandlers:
 
         await CartEventHandlers._update_analytics("cart_cleared", payload)
 
+    @staticmethod
+    async def handle_prices_updated(event_data: Dict[str, Any]):
+        """Обработка изменения цены товара в корзинах (одно событие на все корзины)"""
+        payload = event_data.get('payload', {})
+        product_id = payload.get('product_id')
+        new_price = payload.get('new_price', 0)
+        cart_ids = payload.get('cart_ids', [])
+
+        logger.info(f"💲 Price of product {product_id} updated in {len(cart_ids)} carts: ${new_price:.2f}")
+
+        for cart_id in cart_ids:
+            await CartEventHandlers._send_notification(
+                cart_id=cart_id,
+                event_type="price_updated",
+                message=f"Цена товара {product_id} в корзине изменилась: ${new_price:.2f}"
+            )
+
+        await CartEventHandlers._update_analytics("prices_updated", payload)
+
+    @staticmethod
+    async def handle_product_unavailable(event_data: Dict[str, Any]):
+        """Обработка недоступности товара (деактивирован или закончился) для пачки корзин"""
+        payload = event_data.get('payload', {})
+        product_id = payload.get('product_id')
+        reason = payload.get('reason')
+        cart_ids = payload.get('cart_ids', [])
+
+        logger.info(f"🚫 Product {product_id} is {reason} in {len(cart_ids)} carts")
+
+        message = (
+            f"Товар {product_id} закончился" if reason == "out_of_stock"
+            else f"Товар {product_id} больше недоступен"
+        )
+        for cart_id in cart_ids:
+            await CartEventHandlers._send_notification(
+                cart_id=cart_id,
+                event_type="product_unavailable",
+                message=message
+            )
+
+        await CartEventHandlers._update_analytics("product_unavailable", payload)
+
     @staticmethod
     async def handle_checkout_initiated(event_data: Dict[str, Any]):
         """Обработка начала оформления заказа"""
@@ -0,0 +1,75 @@
+from logging.config import fileConfig
+from sqlalchemy import engine_from_config
+from sqlalchemy import pool
+from alembic import context
+import os
+import sys
+
+# this is the Alembic Config object
+config = context.config
+
+# Interpret the config file for Python logging.
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# Добавляем путь к корневой директории проекта
+current_path = os.path.dirname(os.path.realpath(__file__))
+root_path = os.path.dirname(current_path)
+sys.path.insert(0, root_path)
+
+# add your model's MetaData object here for 'autogenerate' support
+try:
+    from app.config import settings
+    from app.database import Base, MIGRATIONS_VERSION_TABLE
+    from app.models.order import Order
+    from app.models.order_item import OrderItem
+    from app.models.payment import Payment
+    from app.models.order_counter import OrderCounter
+    target_metadata = Base.metadata
+
+    # Берём URL из настроек приложения; миграции выполняются синхронным драйвером
+    config.set_main_option(
+        "sqlalchemy.url",
+        settings.database_url.replace("postgresql+asyncpg://", "postgresql+psycopg2://")
+    )
+except ImportError as e:
+    print(f"Warning: Could not import models: {e}")
+    target_metadata = None
+    MIGRATIONS_VERSION_TABLE = "order_service_alembic_version"
+
+def run_migrations_offline() -> None:
+    """Run migrations in 'offline' mode."""
+    url = config.get_main_option("sqlalchemy.url")
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        version_table=MIGRATIONS_VERSION_TABLE,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode."""
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            version_table=MIGRATIONS_VERSION_TABLE,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
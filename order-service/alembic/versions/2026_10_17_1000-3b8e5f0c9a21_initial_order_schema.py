@@ -0,0 +1,111 @@
+"""initial order schema
+
+Revision ID: 3b8e5f0c9a21
+Revises: 
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e5f0c9a21'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ORDER_STATUS = sa.Enum(
+    "PENDING", "CONFIRMED", "PROCESSING", "SHIPPED", "DELIVERED", "CANCELLED", "REFUNDED",
+    name="orderstatus"
+)
+PAYMENT_STATUS = sa.Enum(
+    "PENDING", "PROCESSING", "COMPLETED", "FAILED", "CANCELLED", "REFUNDED",
+    name="paymentstatus"
+)
+PAYMENT_METHOD = sa.Enum("CARD", "BANK_TRANSFER", "CASH", "DIGITAL_WALLET", name="paymentmethod")
+
+
+def upgrade() -> None:
+    # Таблицы могли быть созданы раньше через Base.metadata.create_all —
+    # в этом случае только фиксируем версию схемы
+    if op.get_context().as_sql:
+        existing_tables = set()
+    else:
+        existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "orders" not in existing_tables:
+        op.create_table(
+            "orders",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("cart_id", sa.String(), nullable=False),
+            sa.Column("user_id", sa.String(), nullable=True),
+            sa.Column("status", ORDER_STATUS, nullable=False),
+            sa.Column("total_amount", sa.Numeric(10, 2), nullable=False),
+            sa.Column("discount_amount", sa.Numeric(10, 2), nullable=True),
+            sa.Column("shipping_amount", sa.Numeric(10, 2), nullable=True),
+            sa.Column("tax_amount", sa.Numeric(10, 2), nullable=True),
+            sa.Column("final_amount", sa.Numeric(10, 2), nullable=False),
+            sa.Column("total_items", sa.Integer(), nullable=False),
+            sa.Column("shipping_address", sa.Text(), nullable=True),
+            sa.Column("shipping_method", sa.String(length=100), nullable=True),
+            sa.Column("notes", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.Column("confirmed_at", sa.DateTime(), nullable=True),
+            sa.Column("shipped_at", sa.DateTime(), nullable=True),
+            sa.Column("delivered_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_orders_id", "orders", ["id"], unique=False)
+        op.create_index("ix_orders_cart_id", "orders", ["cart_id"], unique=False)
+        op.create_index("ix_orders_user_id", "orders", ["user_id"], unique=False)
+
+    if "order_items" not in existing_tables:
+        op.create_table(
+            "order_items",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("order_id", sa.String(), nullable=False),
+            sa.Column("product_id", sa.Integer(), nullable=False),
+            sa.Column("product_name", sa.String(length=255), nullable=False),
+            sa.Column("product_sku", sa.String(length=100), nullable=True),
+            sa.Column("quantity", sa.Integer(), nullable=False),
+            sa.Column("unit_price", sa.Numeric(10, 2), nullable=False),
+            sa.Column("total_price", sa.Numeric(10, 2), nullable=False),
+            sa.ForeignKeyConstraint(["order_id"], ["orders.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_order_items_id", "order_items", ["id"], unique=False)
+
+    if "payments" not in existing_tables:
+        op.create_table(
+            "payments",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("order_id", sa.String(), nullable=False),
+            sa.Column("amount", sa.Numeric(10, 2), nullable=False),
+            sa.Column("currency", sa.String(length=3), nullable=False),
+            sa.Column("method", PAYMENT_METHOD, nullable=False),
+            sa.Column("status", PAYMENT_STATUS, nullable=False),
+            sa.Column("external_transaction_id", sa.String(length=255), nullable=True),
+            sa.Column("provider_response", sa.Text(), nullable=True),
+            sa.Column("failure_reason", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("processed_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["order_id"], ["orders.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_payments_id", "payments", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_payments_id", table_name="payments")
+    op.drop_table("payments")
+    op.drop_index("ix_order_items_id", table_name="order_items")
+    op.drop_table("order_items")
+    op.drop_index("ix_orders_user_id", table_name="orders")
+    op.drop_index("ix_orders_cart_id", table_name="orders")
+    op.drop_index("ix_orders_id", table_name="orders")
+    op.drop_table("orders")
+    PAYMENT_METHOD.drop(op.get_bind(), checkfirst=True)
+    PAYMENT_STATUS.drop(op.get_bind(), checkfirst=True)
+    ORDER_STATUS.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,74 @@
+"""add order checkout event id
+
+Revision ID: 9d4a2c7e1f56
+Revises: 3b8e5f0c9a21
+Create Date: 2026-10-17 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4a2c7e1f56'
+down_revision = '3b8e5f0c9a21'
+branch_labels = None
+depends_on = None
+
+
+def index_state(name: str):
+    """
+    True/False — индекс есть и валиден/невалиден, None — индекса нет.
+    В offline-режиме (--sql) состояние неизвестно: считаем индекс невалидным.
+    """
+    if op.get_context().as_sql:
+        return False
+    return op.get_bind().execute(
+        sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name},
+    ).scalar()
+
+
+def upgrade() -> None:
+    # Колонка переживает прерванную сборку индекса ниже: autocommit_block
+    # фиксирует транзакцию миграции до CREATE INDEX CONCURRENTLY
+    op.add_column(
+        "orders",
+        sa.Column("checkout_event_id", sa.String(length=64), nullable=True),
+        if_not_exists=True,
+    )
+
+    # CONCURRENTLY не блокирует запись в orders, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        state = index_state("ix_orders_checkout_event_id")
+        if state:
+            return
+
+        # Прерванная сборка CONCURRENTLY оставляет INVALID-индекс, который
+        # IF NOT EXISTS пропустил бы, а ON CONFLICT не может использовать
+        if state is False:
+            op.drop_index(
+                "ix_orders_checkout_event_id",
+                table_name="orders",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+        op.create_index(
+            "ix_orders_checkout_event_id",
+            "orders",
+            ["checkout_event_id"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_orders_checkout_event_id",
+            table_name="orders",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("orders", "checkout_event_id")
@@ -0,0 +1,67 @@
+"""add order keyset indexes
+
+Revision ID: 5c1e8a3f7b42
+Revises: 9d4a2c7e1f56
+Create Date: 2026-10-17 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e8a3f7b42'
+down_revision = '9d4a2c7e1f56'
+branch_labels = None
+depends_on = None
+
+# Индексы keyset-пагинации списка заказов: фильтр + (created_at, id)
+KEYSET_INDEXES = {
+    "ix_orders_status_created_at_id": ["status", "created_at", "id"],
+    "ix_orders_user_id_created_at_id": ["user_id", "created_at", "id"],
+    "ix_orders_created_at_id": ["created_at", "id"],
+}
+
+
+def index_state(name: str):
+    """
+    True/False — индекс есть и валиден/невалиден, None — индекса нет.
+    В offline-режиме (--sql) состояние неизвестно: считаем индекс невалидным.
+    """
+    if op.get_context().as_sql:
+        return False
+    return op.get_bind().execute(
+        sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name},
+    ).scalar()
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns in KEYSET_INDEXES.items():
+            state = index_state(name)
+            if state:
+                continue
+
+            # INVALID-индекс после прерванной сборки CONCURRENTLY пересобираем:
+            # IF NOT EXISTS его пропустил бы, а планировщик его не использует
+            if state is False:
+                op.drop_index(name, table_name="orders", postgresql_concurrently=True, if_exists=True)
+
+            op.create_index(
+                name,
+                "orders",
+                columns,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in KEYSET_INDEXES:
+            op.drop_index(
+                name,
+                table_name="orders",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
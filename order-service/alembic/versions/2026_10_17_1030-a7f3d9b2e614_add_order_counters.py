@@ -0,0 +1,44 @@
+"""add order counters
+
+Revision ID: a7f3d9b2e614
+Revises: 5c1e8a3f7b42
+Create Date: 2026-10-17 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7f3d9b2e614'
+down_revision = '5c1e8a3f7b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_counters",
+        sa.Column(
+            "status",
+            postgresql.ENUM(name="orderstatus", create_type=False),
+            primary_key=True,
+        ),
+        sa.Column("user_id", sa.String(), primary_key=True),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+    # Начальные значения по существующим заказам: '*' — общий счётчик статуса
+    op.execute(
+        """
+        INSERT INTO order_counters (status, user_id, count)
+        SELECT status, '*', count(*) FROM orders GROUP BY status
+        UNION ALL
+        SELECT status, user_id, count(*) FROM orders WHERE user_id IS NOT NULL GROUP BY status, user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("order_counters")
@@ -0,0 +1,28 @@
+"""add order version
+
+Revision ID: c4b8e2a6d093
+Revises: a7f3d9b2e614
+Create Date: 2026-10-17 10:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4b8e2a6d093'
+down_revision = 'a7f3d9b2e614'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Константный DEFAULT не переписывает таблицу (PostgreSQL 11+)
+    op.add_column(
+        "orders",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("orders", "version")
@@ -9,12 +9,16 @@ from ...services.order_service import OrderService
 from ...services.payment_service import PaymentService
 from ...models.order import OrderStatus
 from ...api.dependencies import get_order_service, get_payment_service
+from ...utils.helpers import encode_cursor, decode_cursor
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+# Допустимые значения ?include= списка заказов
+LIST_INCLUDES = {"items"}
+
 
 @router.get("/", response_model=OrderListResponse)
 async def get_orders(
@@ -22,27 +26,49 @@ async def get_orders(
         per_page: int = Query(10, ge=1, le=100, description="Количество на странице"),
         status: Optional[OrderStatus] = Query(None, description="Фильтр по статусу"),
         user_id: Optional[str] = Query(None, description="Фильтр по пользователю"),
+        cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы (вместо page)"),
+        exact_total: bool = Query(False, description="COUNT(*) по orders вместо счётчиков order_counters"),
+        include: Optional[str] = Query(None, description="Дополнительные данные через запятую: items"),
         order_service: OrderService = Depends(get_order_service)
 ):
     """Получить список заказов с пагинацией и фильтрами"""
     try:
-        # Получаем реальные заказы из сервиса
-        orders = await order_service.get_all_orders(
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    includes = {part.strip() for part in include.split(",") if part.strip()} if include else set()
+    if includes - LIST_INCLUDES:
+        raise HTTPException(status_code=400, detail=f"Unsupported include: {', '.join(sorted(includes - LIST_INCLUDES))}")
+
+    try:
+        # Получаем реальные заказы из сервиса (без позиций, если они не запрошены)
+        orders = await order_service.get_order_summaries(
             skip=(page - 1) * per_page,
             limit=per_page,
             status=status,
-            user_id=user_id
+            user_id=user_id,
+            after=after,
+            include_items="items" in includes
         )
 
         # Получаем общее количество
-        total = await order_service.count_orders(status=status, user_id=user_id)
+        if exact_total:
+            total = await order_service.count_orders(status=status, user_id=user_id)
+        else:
+            total = await order_service.count_orders_cached(status=status, user_id=user_id)
+
+        next_cursor = None
+        if len(orders) == per_page:
+            next_cursor = encode_cursor(orders[-1]["created_at"], orders[-1]["id"])
 
         return OrderListResponse(
             orders=orders,
             total=total,
             page=page,
             per_page=per_page,
-            total_pages=(total + per_page - 1) // per_page
+            total_pages=(total + per_page - 1) // per_page,
+            next_cursor=next_cursor
         )
     except Exception as e:
         logger.error(f"❌ Error getting orders: {e}")
@@ -85,6 +111,9 @@ async def update_order_status(
         return {"message": f"Order status updated to {new_status.value}"}
     except HTTPException:
         raise
+    except ValueError as e:
+        # Переход запрещён из текущего статуса заказа
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Error updating order {order_id} status: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -106,6 +135,9 @@ async def cancel_order(
         return {"message": "Order cancelled successfully"}
     except HTTPException:
         raise
+    except ValueError as e:
+        # Переход запрещён из текущего статуса заказа
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Error cancelling order {order_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -126,6 +158,9 @@ async def confirm_order(
         return {"message": "Order confirmed successfully"}
     except HTTPException:
         raise
+    except ValueError as e:
+        # Переход запрещён из текущего статуса заказа
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Error confirming order {order_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
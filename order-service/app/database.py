@@ -1,13 +1,88 @@
+import os
+import time
+import uuid
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
 
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений со статистикой выдачи.
+
+    Время выдачи включает ожидание свободного соединения, открытие нового
+    (overflow) и pre-ping — по нему и пиковому overflow подбирается размер пула.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.peak_overflow = 0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.peak_overflow = max(self.peak_overflow, self.overflow())
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "peak_overflow": max(self.peak_overflow, 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_ms_max": round(self.wait_max * 1000, 3),
+        }
+
+
+def _connect_args() -> dict:
+    """Параметры asyncpg: кэш подготовленных выражений или режим PgBouncer"""
+    if settings.db_pgbouncer:
+        # В transaction pooling соседние транзакции попадают на разные серверные
+        # соединения: подготовленные выражения не переиспользуются между ними
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {
+        "statement_cache_size": settings.db_statement_cache_size,
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+    }
+
+
 # Создаем асинхронный движок
 engine = create_async_engine(
     settings.database_url,
-    echo=settings.debug,
-    future=True
+    echo=settings.db_echo,
+    poolclass=MeteredQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    connect_args=_connect_args()
 )
 
 # Создаем сессию
@@ -27,4 +102,45 @@ async def get_db():
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+def pool_stats() -> dict:
+    """Метрики пула соединений движка"""
+    return engine.pool.stats()
+
+
+# Корень сервиса, где лежат alembic.ini и каталог alembic/
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# БД общая с cart-service, поэтому у order-service своя таблица версий Alembic
+MIGRATIONS_VERSION_TABLE = "order_service_alembic_version"
+
+
+def get_migration_heads() -> set[str]:
+    """Head-ревизии из скриптов миграций"""
+    config = Config(os.path.join(SERVICE_ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVICE_ROOT, "alembic"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+async def check_migrations():
+    """
+    Проверяет, что схема БД соответствует последней миграции.
+    Схема создаётся только через `alembic upgrade head`, не при старте приложения.
+    """
+    async with engine.connect() as conn:
+        current = await conn.run_sync(
+            lambda sync_conn: set(
+                MigrationContext.configure(
+                    sync_conn, opts={"version_table": MIGRATIONS_VERSION_TABLE}
+                ).get_current_heads()
+            )
+        )
+
+    expected = get_migration_heads()
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is out of date (current: {sorted(current) or 'none'}, "
+            f"expected: {sorted(expected)}). Run 'alembic upgrade head'."
+        )
\ No newline at end of file
@@ -1,9 +1,11 @@
-import json
 import asyncio
-from typing import Dict, Any, Callable, List
+from typing import Dict, Any, Callable, List, Optional
 from aiokafka import AIOKafkaConsumer
 import logging
 
+from shared.utils.consumer_engine import BatchCollector, PartitionedConsumerEngine
+from shared.utils.kafka_utils import decode_event, get_event_type
+
 from ..config import settings
 
 logger = logging.getLogger(__name__)
@@ -15,18 +17,30 @@ class OrderEventConsumer:
     def __init__(self):
         self.consumer = None
         self.handlers: Dict[str, List[Callable]] = {}
+        self.batch_handlers: Dict[str, BatchCollector] = {}
         self.running = False
+        self.skipped = 0  # События без обработчика, отброшенные по заголовку
+        self.engine: Optional[PartitionedConsumerEngine] = None
 
     async def start(self):
         """Запуск Kafka Consumer"""
         try:
             self.consumer = AIOKafkaConsumer(
-                *settings.kafka_topics,
                 bootstrap_servers=settings.kafka_bootstrap_servers,
                 group_id=settings.kafka_group_id,
                 auto_offset_reset=settings.kafka_auto_offset_reset,
-                value_deserializer=lambda m: json.loads(m.decode('utf-8'))
+                enable_auto_commit=False  # Коммитит PartitionedConsumerEngine
+            )
+            self.engine = PartitionedConsumerEngine(
+                self.consumer,
+                self._process_message,
+                max_in_flight=settings.kafka_max_in_flight_per_partition,
+                max_buffered=settings.kafka_max_buffered_per_partition,
+                commit_every=settings.kafka_commit_every_messages,
+                commit_interval_ms=settings.kafka_commit_interval_ms
             )
+            # Listener коммитит обработанное перед отзывом партиций при ребалансировке
+            self.consumer.subscribe(settings.kafka_topics, listener=self.engine.rebalance_listener())
 
             await self.consumer.start()
             logger.info(f"✅ Order consumer started for topics: {settings.kafka_topics}")
@@ -38,6 +52,8 @@ class OrderEventConsumer:
     async def stop(self):
         """Остановка Kafka Consumer"""
         self.running = False
+        if self.engine:
+            await self.engine.stop()
         if self.consumer:
             try:
                 await self.consumer.stop()
@@ -52,8 +68,16 @@ class OrderEventConsumer:
         self.handlers[event_type].append(handler)
         logger.info(f"✅ Registered handler for event type: {event_type}")
 
+    def register_batch_handler(self, event_type: str, handler: Callable, max_size: int, max_wait_ms: int):
+        """
+        Регистрация пакетного обработчика: handler получает список событий.
+        События этого типа копятся до max_size штук или max_wait_ms.
+        """
+        self.batch_handlers[event_type] = BatchCollector(handler, max_size=max_size, max_wait_ms=max_wait_ms)
+        logger.info(f"✅ Registered batch handler for event type: {event_type} (batch size: {max_size})")
+
     async def consume_events(self):
-        """Основной цикл потребления событий"""
+        """Основной цикл потребления событий: партиции обрабатываются параллельно"""
         if not self.consumer:
             raise RuntimeError("Consumer not started")
 
@@ -61,31 +85,30 @@ class OrderEventConsumer:
         logger.info("🔄 Starting order event consumption...")
 
         try:
-            async for message in self.consumer:
-                if not self.running:
-                    break
-
-                try:
-                    # Извлекаем данные события
-                    event_data = message.value
-                    topic = message.topic
-                    partition = message.partition
-                    offset = message.offset
+            await self.engine.run()
+        except Exception as e:
+            logger.error(f"❌ Error in order consume loop: {e}")
+            raise
 
-                    logger.info(
-                        f"📨 Received event: {event_data.get('event_type')} "
-                        f"from {topic} (partition: {partition}, offset: {offset})"
-                    )
+    async def _process_message(self, message):
+        """Обработка одной записи Kafka"""
+        # Маршрутизация по заголовку: без обработчика значение не декодируем
+        header_type = get_event_type(message.headers)
+        if header_type is not None and header_type not in self.handlers and header_type not in self.batch_handlers:
+            self.skipped += 1
+            logger.debug(f"⏭️ Skipping {header_type} from {message.topic}: no handlers registered")
+            return
 
-                    # Обрабатываем событие
-                    await self._process_event(event_data, topic)
+        # Извлекаем данные события
+        event_data = decode_event(message.value, message.headers)
 
-                except Exception as e:
-                    logger.error(f"❌ Error processing message: {e}")
+        logger.info(
+            f"📨 Received event: {event_data.get('event_type')} "
+            f"from {message.topic} (partition: {message.partition}, offset: {message.offset})"
+        )
 
-        except Exception as e:
-            logger.error(f"❌ Error in order consume loop: {e}")
-            raise
+        # Обрабатываем событие
+        await self._process_event(event_data, message.topic)
 
     async def _process_event(self, event_data: Dict[str, Any], topic: str):
         """Обработка отдельного события"""
@@ -95,6 +118,12 @@ class OrderEventConsumer:
             logger.warning(f"⚠️ Event without type received from {topic}")
             return
 
+        # Пакетный обработчик: ждём обработки пачки, в которую попало событие
+        batch = self.batch_handlers.get(event_type)
+        if batch:
+            await batch.submit(event_data)
+            return
+
         # Находим обработчики для этого типа события
         handlers = self.handlers.get(event_type, [])
 
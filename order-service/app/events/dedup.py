@@ -0,0 +1,43 @@
+from collections import OrderedDict
+from typing import Optional
+
+from ..config import settings
+
+
+class RecentEventIds:
+    """
+    LRU недавно обработанных event_id.
+
+    Повторно доставленные события (replay, ребалансировка) отсекаются без
+    обращения к БД. Кэш не заменяет уникальный ключ в БД: после рестарта или
+    вытеснения дубль отсекается ON CONFLICT DO NOTHING.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._ids: "OrderedDict[str, None]" = OrderedDict()
+        self.hits = 0
+
+    def seen(self, event_id: Optional[str]) -> bool:
+        """Событие уже обработано этим экземпляром сервиса"""
+        if event_id is None or event_id not in self._ids:
+            return False
+        self._ids.move_to_end(event_id)
+        self.hits += 1
+        return True
+
+    def add(self, event_id: Optional[str]):
+        """Запоминает обработанное событие"""
+        if event_id is None:
+            return
+        self._ids[event_id] = None
+        self._ids.move_to_end(event_id)
+        while len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._ids), "max_size": self.max_size, "hits": self.hits}
+
+
+# Обработанные события checkout_initiated
+recent_checkout_events = RecentEventIds(settings.checkout_dedup_cache_size)
@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -18,8 +18,12 @@ class OrderEventHandlers:
             # Импортируем только когда нужно, чтобы избежать circular import
             from ..database import AsyncSessionLocal
             from ..services.order_service import OrderService
-            from ..services.payment_service import PaymentService
-            from ..models.payment import PaymentStatus
+            from .dedup import recent_checkout_events
+
+            event_id = event_data.get('event_id')
+            if recent_checkout_events.seen(event_id):
+                logger.info(f"⏭️ Checkout event {event_id} already processed, skipping")
+                return
 
             payload = event_data.get('payload', {})
             cart_id = payload.get('cart_id')
@@ -33,26 +37,65 @@ class OrderEventHandlers:
                 logger.warning("⚠️ Invalid checkout event: missing cart_id or items")
                 return
 
-            # Создаем заказ
+            # Создаем заказ вместе с запросом на оплату (одна транзакция)
             async with AsyncSessionLocal() as db:
                 order_service = OrderService(db)
 
-                order = await order_service.create_order_from_cart(
+                await order_service.create_order_from_cart(
                     cart_id=cart_id,
                     items=items,
                     total_amount=total_amount,
-                    total_items=total_items
+                    total_items=total_items,
+                    checkout_event_id=event_id
                 )
 
-                logger.info(f"✅ Order {order.id} created from cart {cart_id}")
-
-                # Запрашиваем обработку платежа
-                payment_service = PaymentService(db)
-                await payment_service.request_payment(order)
+            recent_checkout_events.add(event_id)
 
         except Exception as e:
             logger.error(f"❌ Error handling checkout_initiated: {e}")
 
+    @staticmethod
+    async def handle_checkout_initiated_batch(events: List[Dict[str, Any]]):
+        """
+        Пакетная обработка checkout: все заказы, позиции и платежи пачки
+        создаются в одной транзакции, события публикуются одним батчем.
+        Если пачка не прошла, события обрабатываются по одному, чтобы
+        ошибочное событие не блокировало остальные.
+        """
+        from ..database import AsyncSessionLocal
+        from ..services.order_service import OrderService
+        from .dedup import recent_checkout_events
+
+        carts = []
+        event_ids = []
+        for event_data in events:
+            event_id = event_data.get('event_id')
+            # Повторы отсекаются и по LRU недавних событий, и внутри самой пачки
+            if recent_checkout_events.seen(event_id) or (event_id and event_id in event_ids):
+                logger.info(f"⏭️ Checkout event {event_id} already processed, skipping")
+                continue
+            payload = event_data.get('payload', {})
+            if not payload.get('cart_id') or not payload.get('items'):
+                logger.warning("⚠️ Invalid checkout event: missing cart_id or items")
+                continue
+            carts.append(payload)
+            event_ids.append(event_id)
+
+        if not carts:
+            return
+
+        logger.info(f"🛒 Processing checkout batch of {len(carts)} carts")
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await OrderService(db).create_orders_from_carts(carts, event_ids=event_ids)
+            for event_id in event_ids:
+                recent_checkout_events.add(event_id)
+        except Exception as e:
+            logger.error(f"❌ Checkout batch failed, falling back to per-event processing: {e}")
+            for event_data in events:
+                await OrderEventHandlers.handle_checkout_initiated(event_data)
+
     @staticmethod
     async def handle_payment_processed(event_data: Dict[str, Any]):
         """
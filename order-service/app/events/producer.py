@@ -1,11 +1,13 @@
-import json
+import asyncio
 import logging
 import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
 from aiokafka import AIOKafkaProducer
 from aiokafka.errors import KafkaConnectionError, KafkaTimeoutError
 
+from shared.utils.kafka_utils import encode_event, get_codec
+
 from ..config import settings
 
 logger = logging.getLogger(__name__)
@@ -17,13 +19,13 @@ class OrderEventProducer:
     def __init__(self):
         self.producer: Optional[AIOKafkaProducer] = None
         self.bootstrap_servers = settings.kafka_bootstrap_servers
+        self.codec = get_codec(settings.kafka_codec)
 
     async def start(self):
         """Запуск Kafka продюсера"""
         try:
             self.producer = AIOKafkaProducer(
                 bootstrap_servers=self.bootstrap_servers,
-                value_serializer=lambda v: json.dumps(v).encode('utf-8'),
                 key_serializer=lambda k: k.encode('utf-8') if k else None,
                 # УБИРАЕМ неправильный параметр max_in_flight_requests_per_connection
                 retry_backoff_ms=1000,
@@ -72,16 +74,11 @@ class OrderEventProducer:
 
         try:
             # Создаем стандартное событие
-            event = {
-                "event_id": str(uuid.uuid4()),
-                "event_type": event_type,
-                "event_timestamp": datetime.utcnow().isoformat(),
-                "producer_service": "order-service",
-                "payload": payload
-            }
+            event = self._build_event(event_type, payload)
 
             # Отправляем событие
-            future = await self.producer.send(topic, value=event, key=key)
+            value, headers = encode_event(event, self.codec)
+            future = await self.producer.send(topic, value=value, key=key, headers=headers)
             record_metadata = await future
 
             logger.info(
@@ -100,6 +97,45 @@ class OrderEventProducer:
             logger.error(f"❌ Error publishing event {event_type} to {topic}: {e}")
             return False
 
+    @staticmethod
+    def _build_event(event_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Стандартная обёртка события"""
+        return {
+            "event_id": str(uuid.uuid4()),
+            "event_type": event_type,
+            "event_timestamp": datetime.utcnow().isoformat(),
+            "producer_service": "order-service",
+            "payload": payload
+        }
+
+    async def publish_batch(self, events: List[Tuple[str, str, Dict[str, Any], Optional[str]]]) -> int:
+        """
+        Пакетная публикация событий (topic, event_type, payload, key).
+
+        Все сообщения ставятся в очередь продюсера до ожидания подтверждений,
+        поэтому уходят общими батчами. Возвращает число доставленных событий.
+        """
+        if not self.producer:
+            logger.error("Order event producer not started")
+            return 0
+
+        futures = []
+        for topic, event_type, payload, key in events:
+            try:
+                value, headers = encode_event(self._build_event(event_type, payload), self.codec)
+                futures.append(await self.producer.send(topic, value=value, key=key, headers=headers))
+            except Exception as e:
+                logger.error(f"❌ Error publishing event {event_type} to {topic}: {e}")
+
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        failed = [result for result in results if isinstance(result, BaseException)]
+        for error in failed:
+            logger.error(f"❌ Error delivering batched event: {error}")
+
+        delivered = len(results) - len(failed)
+        logger.info(f"✅ Published {delivered}/{len(events)} events in batch")
+        return delivered
+
     # Методы для конкретных событий заказов
     async def order_created(self, order_data: Dict[str, Any]) -> bool:
         """Событие создания заказа"""
@@ -146,6 +182,23 @@ class OrderEventProducer:
             key=str(order_data.get("order_id"))
         )
 
+    async def publish_order_confirmed(self, order_data: Dict[str, Any]) -> bool:
+        """Событие подтверждения заказа"""
+        return await self.order_confirmed(order_data)
+
+    async def publish_order_cancelled(self, order_data: Dict[str, Any]) -> bool:
+        """Событие отмены заказа"""
+        return await self.order_cancelled(order_data)
+
+    async def publish_order_shipped(self, order_data: Dict[str, Any]) -> bool:
+        """Событие отправки заказа"""
+        return await self.publish_event(
+            topic="order.shipped",
+            event_type="order_shipped",
+            payload=order_data,
+            key=str(order_data.get("order_id"))
+        )
+
     async def publish_payment_requested(self, payment_data: Dict[str, Any]) -> bool:
         """Событие запроса платежа"""
         return await self.publish_event(
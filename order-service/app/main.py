@@ -6,11 +6,12 @@ import logging
 import asyncio
 
 from .config import settings
-from .database import engine, Base
+from .database import engine, check_migrations, pool_stats
 from .api import api_router
 from .events.producer import order_event_producer
 from .events.consumer import order_event_consumer
 from .events.handlers import OrderEventHandlers
+from .services.catalog_client import CatalogClient
 from .api.routes.orders import router as orders_router
 
 # Настройка логирования
@@ -33,10 +34,12 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Starting Order Service...")
 
     try:
-        # Создаем таблицы
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("✅ Database tables created")
+        # Проверяем версию схемы БД (таблицы создаются миграциями Alembic)
+        await check_migrations()
+        logger.info("✅ Database schema is up to date")
+
+        # Открываем пул HTTP-соединений к catalog-service
+        await CatalogClient.start()
 
         # Запускаем Kafka producer
         await order_event_producer.start()
@@ -46,10 +49,18 @@ async def lifespan(app: FastAPI):
         await order_event_consumer.start()
 
         # Регистрируем обработчики событий
-        order_event_consumer.register_handler(
-            "checkout_initiated",  # ✅ ИСПРАВЛЕНО!
-            OrderEventHandlers.handle_checkout_initiated
-        )
+        if settings.checkout_batch_size > 1:
+            order_event_consumer.register_batch_handler(
+                "checkout_initiated",
+                OrderEventHandlers.handle_checkout_initiated_batch,
+                max_size=settings.checkout_batch_size,
+                max_wait_ms=settings.checkout_batch_wait_ms
+            )
+        else:
+            order_event_consumer.register_handler(
+                "checkout_initiated",  # ✅ ИСПРАВЛЕНО!
+                OrderEventHandlers.handle_checkout_initiated
+            )
         order_event_consumer.register_handler(
             "payment_processed",
             OrderEventHandlers.handle_payment_processed
@@ -90,6 +101,9 @@ async def lifespan(app: FastAPI):
         await order_event_producer.stop()
         logger.info("✅ Kafka producer stopped")
 
+        # Закрываем пул HTTP-соединений
+        await CatalogClient.stop()
+
         # Закрываем соединение с БД
         await engine.dispose()
         logger.info("✅ Database connection closed")
@@ -142,6 +156,16 @@ async def health_check():
         raise HTTPException(status_code=503, detail="Service unhealthy")
 
 
+@app.get("/health/db")
+async def database_pool_stats():
+    """Метрики пула соединений с БД (ожидание, выдачи, overflow)"""
+    return {
+        "service": "order-service",
+        "pgbouncer_mode": settings.db_pgbouncer,
+        "pool": pool_stats()
+    }
+
+
 @app.get("/health/ready")
 async def readiness_check():
     """Проверка готовности к обработке запросов"""
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Enum, Numeric, Text, Integer
+from sqlalchemy import Column, String, DateTime, Enum, Numeric, Text, Integer, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
@@ -15,15 +15,41 @@ class OrderStatus(PyEnum):
     REFUNDED = "refunded"  # Возвращен
 
 
+# Допустимые переходы: целевой статус -> статусы, из которых в него можно перейти
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatus.PENDING: frozenset(),
+    OrderStatus.CONFIRMED: frozenset({OrderStatus.PENDING}),
+    OrderStatus.PROCESSING: frozenset({OrderStatus.CONFIRMED}),
+    OrderStatus.SHIPPED: frozenset({OrderStatus.CONFIRMED, OrderStatus.PROCESSING}),
+    OrderStatus.DELIVERED: frozenset({OrderStatus.SHIPPED}),
+    OrderStatus.CANCELLED: frozenset({OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.PROCESSING}),
+    OrderStatus.REFUNDED: frozenset({
+        OrderStatus.CONFIRMED, OrderStatus.PROCESSING, OrderStatus.SHIPPED, OrderStatus.DELIVERED
+    }),
+}
+
+
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Ключ идемпотентности создания заказа (цель ON CONFLICT в OrderService)
+        Index("ix_orders_checkout_event_id", "checkout_event_id", unique=True),
+        # Keyset-пагинация списка заказов по (created_at, id) с фильтрами и без
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, index=True)  # UUID
     cart_id = Column(String, nullable=False, index=True)  # ID корзины
+    # event_id события checkout_initiated: повторная доставка не создаёт второй заказ
+    checkout_event_id = Column(String(64), nullable=True)
     user_id = Column(String, nullable=True, index=True)  # ID пользователя (если есть)
 
     # Статус заказа
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING, nullable=False)
+    # Версия строки: каждая смена статуса — compare-and-swap с инкрементом
+    version = Column(Integer, default=1, nullable=False)
 
     # Суммы
     total_amount = Column(Numeric(10, 2), nullable=False)
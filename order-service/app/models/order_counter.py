@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Enum, BigInteger
+from .order import OrderStatus
+from ..database import Base
+
+# user_id строки общего счётчика по статусу (по всем пользователям)
+GLOBAL_SCOPE = "*"
+
+
+class OrderCounter(Base):
+    """
+    Количество заказов по (статус, пользователь).
+
+    Поддерживается в той же транзакции, что и изменение заказа, поэтому
+    список заказов берёт total отсюда вместо COUNT(*) по orders.
+    """
+    __tablename__ = "order_counters"
+
+    status = Column(Enum(OrderStatus), primary_key=True)
+    user_id = Column(String, primary_key=True)  # ID пользователя или GLOBAL_SCOPE
+    count = Column(BigInteger, nullable=False, default=0)
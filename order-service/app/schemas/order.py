@@ -74,4 +74,6 @@ class OrderListResponse(BaseModel):
     total: int
     page: int
     per_page: int
-    total_pages: int
\ No newline at end of file
+    total_pages: int
+    # Курсор следующей страницы (None — страница последняя)
+    next_cursor: Optional[str] = None
\ No newline at end of file
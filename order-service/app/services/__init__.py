@@ -1,9 +1,10 @@
 from .order_service import OrderService
 from .payment_service import PaymentService
-from .catalog_client import CatalogClient
+from .catalog_client import CatalogClient, ProductLookupResult
 
 __all__ = [
     "OrderService",
     "PaymentService",
-    "CatalogClient"
+    "CatalogClient",
+    "ProductLookupResult"
 ]
\ No newline at end of file
@@ -1,76 +1,231 @@
+import asyncio
 import httpx
 import logging
-from typing import Optional, Dict, Any
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Tuple
 
 from ..config import settings
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ProductLookupResult:
+    """Результат пакетного запроса товаров с разбивкой по каждому товару"""
+    products: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    not_found: List[int] = field(default_factory=list)
+    failed: Dict[int, str] = field(default_factory=dict)  # product_id -> причина ошибки
+
+    @property
+    def has_failures(self) -> bool:
+        return bool(self.failed)
+
+
 class CatalogClient:
     """Клиент для взаимодействия с catalog-service"""
 
+    # Поддерживает ли каталог batch-endpoint (None — ещё не проверяли)
+    _batch_supported: Optional[bool] = None
+
+    # Общий на процесс HTTP-клиент с пулом keep-alive соединений.
+    # Открывается и закрывается в lifespan приложения (см. main.py)
+    _http: Optional[httpx.AsyncClient] = None
+
     def __init__(self):
         self.base_url = settings.catalog_service_url
-        self.timeout = 30.0
+        self.timeout = settings.catalog_timeout
+
+    @classmethod
+    async def start(cls):
+        """Создание общего пула соединений"""
+        if cls._http is None:
+            cls._http = cls._create_http_client()
+            logger.info(
+                f"✅ Catalog HTTP client started "
+                f"(max_connections={settings.catalog_max_connections}, http2={settings.catalog_http2})"
+            )
+
+    @classmethod
+    async def stop(cls):
+        """Закрытие общего пула соединений"""
+        if cls._http is not None:
+            http, cls._http = cls._http, None
+            await http.aclose()
+            logger.info("✅ Catalog HTTP client stopped")
+
+    @staticmethod
+    def _create_http_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=settings.catalog_service_url,
+            timeout=settings.catalog_timeout,
+            limits=httpx.Limits(
+                max_connections=settings.catalog_max_connections,
+                max_keepalive_connections=settings.catalog_max_keepalive_connections,
+                keepalive_expiry=settings.catalog_keepalive_expiry
+            ),
+            http2=settings.catalog_http2
+        )
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Общий клиент; создаётся лениво, если lifespan ещё не запускался"""
+        if CatalogClient._http is None:
+            CatalogClient._http = self._create_http_client()
+        return CatalogClient._http
 
     async def get_product(self, product_id: int) -> Optional[Dict[str, Any]]:
         """Получает информацию о товаре"""
+        status, data = await self._lookup_product(product_id)
+        return data if status == "found" else None
+
+    async def _lookup_product(self, product_id: int) -> Tuple[str, Any]:
+        """
+        Запрашивает один товар.
+
+        Returns:
+            ("found", product) | ("not_found", None) | ("failed", причина)
+        """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/products/{product_id}")
-
-                if response.status_code == 200:
-                    product_data = response.json()
-                    logger.info(f"✅ Retrieved product {product_id} from catalog")
-                    return product_data
-                elif response.status_code == 404:
-                    logger.warning(f"⚠️ Product {product_id} not found in catalog")
-                    return None
-                else:
-                    logger.error(f"❌ Error getting product {product_id}: {response.status_code}")
-                    return None
+            response = await self.http.get(f"/products/{product_id}")
+
+            if response.status_code == 200:
+                product_data = response.json()
+                logger.info(f"✅ Retrieved product {product_id} from catalog")
+                return "found", product_data
+            elif response.status_code == 404:
+                logger.warning(f"⚠️ Product {product_id} not found in catalog")
+                return "not_found", None
+            else:
+                logger.error(f"❌ Error getting product {product_id}: {response.status_code}")
+                return "failed", f"HTTP {response.status_code}"
 
         except httpx.TimeoutException:
             logger.error(f"❌ Timeout getting product {product_id} from catalog")
-            return None
+            return "failed", "timeout"
         except Exception as e:
             logger.error(f"❌ Error getting product {product_id} from catalog: {e}")
+            return "failed", str(e)
+
+    async def get_products(self, product_ids: list[int]) -> ProductLookupResult:
+        """
+        Пакетно получает товары.
+
+        Использует batch-endpoint каталога, если он есть, иначе выполняет
+        одиночные запросы с ограниченной параллельностью. Ошибки отражаются
+        по каждому товару, а не для всего запроса целиком.
+        """
+        unique_ids = list(dict.fromkeys(product_ids))
+        result = ProductLookupResult()
+
+        if not unique_ids:
+            return result
+
+        pending = unique_ids
+        if settings.catalog_batch_path and CatalogClient._batch_supported is not False:
+            pending = await self._fetch_batches(unique_ids, result)
+
+        if pending:
+            await self._fetch_individually(pending, result)
+
+        logger.info(
+            f"✅ Retrieved {len(result.products)}/{len(unique_ids)} products "
+            f"(not found: {len(result.not_found)}, failed: {len(result.failed)})"
+        )
+        return result
+
+    async def _fetch_batches(self, product_ids: list[int], result: ProductLookupResult) -> list[int]:
+        """
+        Запрашивает товары через batch-endpoint.
+        Возвращает ID, которые нужно догрузить одиночными запросами.
+        """
+        batch_size = settings.catalog_batch_size
+        chunks = [product_ids[i:i + batch_size] for i in range(0, len(product_ids), batch_size)]
+        responses = await asyncio.gather(
+            *(self._fetch_batch(chunk) for chunk in chunks),
+            return_exceptions=True
+        )
+
+        pending = []
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, Exception):
+                logger.error(f"❌ Batch request for {len(chunk)} products failed: {response}")
+                pending.extend(chunk)
+                continue
+
+            if response is None:
+                # Каталог не поддерживает batch-запросы
+                pending.extend(chunk)
+                continue
+
+            for product in response:
+                if product.get("id") in chunk:
+                    result.products[product["id"]] = product
+            result.not_found.extend(pid for pid in chunk if pid not in result.products)
+
+        return pending
+
+    async def _fetch_batch(self, product_ids: list[int]) -> Optional[List[Dict[str, Any]]]:
+        """Один batch-запрос; None, если endpoint не поддерживается"""
+        response = await self.http.get(
+            settings.catalog_batch_path,
+            params={"ids": ",".join(str(pid) for pid in product_ids)}
+        )
+
+        if response.status_code in (404, 405, 501):
+            if CatalogClient._batch_supported is None:
+                logger.info("ℹ️ Catalog batch endpoint is not available, using per-product requests")
+            CatalogClient._batch_supported = False
             return None
 
-    async def check_products_availability(self, product_ids: list[int]) -> Dict[int, bool]:
-        """Проверяет доступность товаров"""
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # В реальном API это был бы batch-запрос
-                # Пока делаем по одному запросу для каждого товара
-                availability = {}
+        response.raise_for_status()
+        CatalogClient._batch_supported = True
 
-                for product_id in product_ids:
-                    product = await self.get_product(product_id)
-                    availability[product_id] = product is not None and product.get('available', False)
+        data = response.json()
+        return data.get("products", []) if isinstance(data, dict) else data
 
-                logger.info(f"✅ Checked availability for {len(product_ids)} products")
-                return availability
+    async def _fetch_individually(self, product_ids: list[int], result: ProductLookupResult):
+        """Одиночные запросы с ограничением параллельности"""
+        semaphore = asyncio.Semaphore(settings.catalog_max_concurrency)
 
-        except Exception as e:
-            logger.error(f"❌ Error checking products availability: {e}")
-            # В случае ошибки считаем все товары доступными
-            return {pid: True for pid in product_ids}
+        async def lookup(product_id: int):
+            async with semaphore:
+                return await self._lookup_product(product_id)
 
-    async def get_products_info(self, product_ids: list[int]) -> Dict[int, Dict[str, Any]]:
-        """Получает информацию о нескольких товарах"""
-        try:
-            products_info = {}
+        lookups = await asyncio.gather(*(lookup(pid) for pid in product_ids))
 
-            for product_id in product_ids:
-                product = await self.get_product(product_id)
-                if product:
-                    products_info[product_id] = product
+        for product_id, (status, data) in zip(product_ids, lookups):
+            if status == "found":
+                result.products[product_id] = data
+            elif status == "not_found":
+                result.not_found.append(product_id)
+            else:
+                result.failed[product_id] = data
 
-            logger.info(f"✅ Retrieved info for {len(products_info)} products")
-            return products_info
+    async def check_products_availability(self, product_ids: list[int]) -> Dict[int, Optional[bool]]:
+        """
+        Проверяет доступность товаров.
 
-        except Exception as e:
-            logger.error(f"❌ Error getting products info: {e}")
-            return {}
\ No newline at end of file
+        Returns:
+            product_id -> True/False; None, если товар не удалось проверить
+        """
+        result = await self.get_products(product_ids)
+
+        availability: Dict[int, Optional[bool]] = {}
+        for product_id in dict.fromkeys(product_ids):
+            if product_id in result.products:
+                availability[product_id] = bool(result.products[product_id].get('available', False))
+            elif product_id in result.failed:
+                availability[product_id] = None
+            else:
+                availability[product_id] = False
+
+        if result.has_failures:
+            logger.warning(f"⚠️ Could not check availability for products: {list(result.failed)}")
+
+        logger.info(f"✅ Checked availability for {len(availability)} products")
+        return availability
+
+    async def get_products_info(self, product_ids: list[int]) -> Dict[int, Dict[str, Any]]:
+        """Получает информацию о нескольких товарах"""
+        result = await self.get_products(product_ids)
+        return result.products
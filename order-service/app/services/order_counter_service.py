@@ -0,0 +1,75 @@
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+
+from ..models.order import OrderStatus
+from ..models.order_counter import OrderCounter, GLOBAL_SCOPE
+import logging
+
+logger = logging.getLogger(__name__)
+
+CounterDeltas = Dict[Tuple[OrderStatus, str], int]
+
+
+class OrderCounterService:
+    """
+    Счётчики заказов по статусам (order_counters).
+
+    Изменения копятся в словаре дельт и применяются одним upsert'ом в
+    транзакции изменения заказа, перед её коммитом: так общие строки
+    счётчиков блокируются на минимальное время.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def new_deltas() -> CounterDeltas:
+        return defaultdict(int)
+
+    @staticmethod
+    def add(deltas: CounterDeltas, status: OrderStatus, user_id: Optional[str], delta: int):
+        """Учитывает delta заказов в статусе status: в общем счётчике и в счётчике пользователя"""
+        deltas[(status, GLOBAL_SCOPE)] += delta
+        if user_id:
+            deltas[(status, user_id)] += delta
+
+    @classmethod
+    def transition(cls, deltas: CounterDeltas, old: OrderStatus, new: OrderStatus, user_id: Optional[str]):
+        """Учитывает переход заказа из статуса old в new"""
+        if old == new:
+            return
+        cls.add(deltas, old, user_id, -1)
+        cls.add(deltas, new, user_id, 1)
+
+    async def apply(self, deltas: CounterDeltas):
+        """Применяет дельты одним INSERT ... ON CONFLICT DO UPDATE (без коммита)"""
+        # Одинаковый порядок строк во всех транзакциях исключает взаимные блокировки
+        rows = [
+            {"status": status, "user_id": user_id, "count": delta}
+            for (status, user_id), delta in sorted(deltas.items(), key=lambda kv: (kv[0][0].name, kv[0][1]))
+            if delta
+        ]
+        if not rows:
+            return
+
+        stmt = insert(OrderCounter).values(rows)
+        await self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[OrderCounter.status, OrderCounter.user_id],
+                set_={"count": OrderCounter.count + stmt.excluded.count}
+            )
+        )
+
+    async def count(self, status: Optional[OrderStatus] = None, user_id: Optional[str] = None) -> int:
+        """Количество заказов с фильтрами: не больше одной строки на статус"""
+        query = select(func.coalesce(func.sum(OrderCounter.count), 0)).where(
+            OrderCounter.user_id == (user_id or GLOBAL_SCOPE)
+        )
+        if status:
+            query = query.where(OrderCounter.status == status)
+
+        result = await self.db.execute(query)
+        return int(result.scalar())
@@ -1,25 +1,56 @@
+import asyncio
+import random
 import uuid
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import selectinload
 from datetime import datetime
 from decimal import Decimal
 
-from ..models.order import Order, OrderStatus
+from ..config import settings
+from ..models.order import Order, OrderStatus, ORDER_STATUS_TRANSITIONS
 from ..models.order_item import OrderItem
-from ..models.payment import Payment
+from ..models.payment import Payment, PaymentStatus, PaymentMethod
 from ..events.producer import order_event_producer
+from .payment_service import PaymentService
+from .order_counter_service import OrderCounterService
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Строк в одном multi-row INSERT позиций (ограничение числа параметров запроса)
+ORDER_ITEMS_INSERT_CHUNK = 1000
+
+# Колонки заказа в списке (OrderResponse без позиций)
+ORDER_SUMMARY_COLUMNS = (
+    Order.id, Order.cart_id, Order.user_id, Order.status,
+    Order.total_amount, Order.discount_amount, Order.shipping_amount, Order.tax_amount,
+    Order.final_amount, Order.total_items,
+    Order.shipping_address, Order.shipping_method, Order.notes,
+    Order.created_at, Order.updated_at, Order.confirmed_at, Order.shipped_at, Order.delivered_at,
+)
+
+# Колонки заказа, из которых строятся события смены статуса (RETURNING)
+ORDER_EVENT_COLUMNS = (
+    Order.id, Order.cart_id, Order.user_id, Order.status,
+    Order.confirmed_at, Order.shipped_at, Order.shipping_address, Order.shipping_method,
+)
+
+ORDER_ITEM_COLUMNS = (
+    OrderItem.id, OrderItem.order_id, OrderItem.product_id, OrderItem.product_name,
+    OrderItem.product_sku, OrderItem.quantity, OrderItem.unit_price, OrderItem.total_price,
+)
+
 
 class OrderService:
     """Сервис для работы с заказами"""
 
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.counters = OrderCounterService(db)
 
     async def create_order_from_cart(
             self,
@@ -28,56 +59,168 @@ class OrderService:
             total_amount: float,
             total_items: int,
             user_id: Optional[str] = None,
-            shipping_address: Optional[str] = None
-    ) -> Order:
-        """Создает заказ из данных корзины"""
-        try:
-            # Создаем заказ
+            shipping_address: Optional[str] = None,
+            checkout_event_id: Optional[str] = None,
+            payment_method: PaymentMethod = PaymentMethod.CARD
+    ) -> Optional[Order]:
+        """
+        Создает заказ из данных корзины вместе с запросом на оплату.
+
+        Заказ, позиции и платеж пишутся одной транзакцией (пачка из одной
+        корзины в create_orders_from_carts): сбой между ними не оставит заказ
+        без платежа. checkout_event_id — event_id исходного события
+        checkout_initiated: если заказ по нему уже создан, возвращает None.
+        """
+        cart = {
+            "cart_id": cart_id,
+            "items": items,
+            "total_amount": total_amount,
+            "total_items": total_items,
+            "user_id": user_id,
+            "shipping_address": shipping_address
+        }
+        orders = await self.create_orders_from_carts(
+            [cart], event_ids=[checkout_event_id], payment_method=payment_method
+        )
+
+        if not orders:
+            logger.info(f"⏭️ Order for checkout event {checkout_event_id} already exists, skipping")
+            return None
+
+        logger.info(f"✅ Order {orders[0].id} created from cart {cart_id}")
+        return orders[0]
+
+    async def create_orders_from_carts(
+            self,
+            carts: List[Dict[str, Any]],
+            event_ids: Optional[List[Optional[str]]] = None,
+            payment_method: PaymentMethod = PaymentMethod.CARD
+    ) -> List[Order]:
+        """
+        Пакетно создаёт заказы, их позиции и запросы на оплату.
+
+        carts — payload'ы событий checkout_initiated, event_ids — их event_id.
+        Все строки вставляются multi-row INSERT'ами в одной транзакции, после
+        коммита события order_created и payment_requested уходят одним батчем
+        продюсера. Заказы по уже обработанным event_id пропускаются
+        (ON CONFLICT DO NOTHING); возвращаются только созданные.
+        """
+        event_ids = event_ids or [None] * len(carts)
+        now = datetime.utcnow()
+        orders: List[Order] = []
+        order_items: Dict[str, List[OrderItem]] = {}
+        payments: List[Payment] = []
+
+        for cart, event_id in zip(carts, event_ids):
             order_id = str(uuid.uuid4())
+            total_amount = Decimal(str(cart.get('total_amount', 0)))
 
             order = Order(
                 id=order_id,
-                cart_id=cart_id,
-                user_id=user_id,
+                cart_id=cart['cart_id'],
+                checkout_event_id=event_id,
+                user_id=cart.get('user_id'),
                 status=OrderStatus.PENDING,
-                total_amount=Decimal(str(total_amount)),
-                final_amount=Decimal(str(total_amount)),  # Пока без скидок и налогов
-                total_items=total_items,
-                shipping_address=shipping_address
+                version=1,
+                total_amount=total_amount,
+                discount_amount=Decimal("0.00"),
+                shipping_amount=Decimal("0.00"),
+                tax_amount=Decimal("0.00"),
+                final_amount=total_amount,  # Пока без скидок и налогов
+                total_items=cart.get('total_items', 0),
+                shipping_address=cart.get('shipping_address'),
+                created_at=now,
+                updated_at=now
             )
+            orders.append(order)
 
-            self.db.add(order)
-            await self.db.flush()  # Получаем ID заказа
-
-            # Создаем позиции заказа
-            order_items = []
-            for item_data in items:
-                order_item = OrderItem(
-                    order_id=order.id,
+            order_items[order_id] = [
+                OrderItem(
+                    order_id=order_id,
                     product_id=item_data['product_id'],
                     product_name=item_data.get('product_name', f"Product {item_data['product_id']}"),
+                    product_sku=item_data.get('product_sku'),
                     quantity=item_data['quantity'],
                     unit_price=Decimal(str(item_data['price_at_add'])),
                     total_price=Decimal(str(item_data['price_at_add'] * item_data['quantity']))
                 )
-                order_items.append(order_item)
-                self.db.add(order_item)
+                for item_data in cart['items']
+            ]
+
+            payments.append(Payment(
+                id=str(uuid.uuid4()),
+                order_id=order_id,
+                amount=total_amount,
+                currency="USD",
+                method=payment_method,
+                status=PaymentStatus.PENDING,
+                created_at=now
+            ))
+
+        if not orders:
+            return []
 
-            await self.db.commit()
-            await self.db.refresh(order)
+        try:
+            result = await self.db.execute(
+                insert(Order)
+                .values([self._row(order, Order) for order in orders])
+                .on_conflict_do_nothing(index_elements=[Order.checkout_event_id])
+                .returning(Order.id)
+            )
+            created = set(result.scalars().all())
+
+            if len(created) < len(orders):
+                logger.info(f"⏭️ {len(orders) - len(created)} checkout events already processed, skipping")
+                payments = [payment for payment in payments if payment.order_id in created]
+                orders = [order for order in orders if order.id in created]
+                order_items = {order_id: items for order_id, items in order_items.items() if order_id in created}
 
-            logger.info(f"✅ Order {order.id} created from cart {cart_id}")
+            if not orders:
+                await self.db.rollback()
+                return []
 
-            # Публикуем событие создания заказа
-            await self._publish_order_created_event(order, order_items)
+            item_rows = [self._row(item, OrderItem, exclude=("id",)) for items in order_items.values() for item in items]
+            for start in range(0, len(item_rows), ORDER_ITEMS_INSERT_CHUNK):
+                await self.db.execute(insert(OrderItem).values(item_rows[start:start + ORDER_ITEMS_INSERT_CHUNK]))
 
-            return order
+            await self.db.execute(insert(Payment).values([self._row(payment, Payment) for payment in payments]))
+
+            deltas = self.counters.new_deltas()
+            for order in orders:
+                self.counters.add(deltas, order.status, order.user_id, 1)
+            await self.counters.apply(deltas)
+            await self.db.commit()
 
         except Exception as e:
             await self.db.rollback()
-            logger.error(f"❌ Error creating order from cart {cart_id}: {e}")
+            logger.error(f"❌ Error creating {len(orders)} orders in batch: {e}")
             raise
 
+        logger.info(f"✅ {len(orders)} orders created in batch")
+
+        events = []
+        for order, payment in zip(orders, payments):
+            events.append((
+                "order.created", "order_created",
+                self._order_created_payload(order, order_items[order.id]), order.id
+            ))
+            events.append((
+                "payment.requested", "payment_requested",
+                PaymentService.payment_requested_payload(payment, order), order.id
+            ))
+        await order_event_producer.publish_batch(events)
+
+        return orders
+
+    @staticmethod
+    def _row(instance, model, exclude: tuple = ()) -> Dict[str, Any]:
+        """Значения колонок несохранённого объекта для multi-row INSERT (одинаковый набор ключей)"""
+        return {
+            column.key: getattr(instance, column.key)
+            for column in model.__table__.columns
+            if column.key not in exclude
+        }
+
     async def get_order(self, order_id: str) -> Optional[Order]:
         """Получает заказ по ID"""
         try:
@@ -95,26 +238,19 @@ class OrderService:
     async def confirm_order(self, order_id: str) -> bool:
         """Подтверждает заказ после успешной оплаты"""
         try:
-            # Обновляем статус заказа
-            query = update(Order).where(Order.id == order_id).values(
-                status=OrderStatus.CONFIRMED,
-                confirmed_at=datetime.utcnow()
-            )
-
-            result = await self.db.execute(query)
+            # Обновляем статус заказа и получаем данные для события тем же запросом
+            order = await self._change_status(order_id, {
+                "status": OrderStatus.CONFIRMED,
+                "confirmed_at": datetime.utcnow()
+            })
             await self.db.commit()
 
-            if result.rowcount > 0:
-                logger.info(f"✅ Order {order_id} confirmed")
+            if order is None:
+                return await self._check_rejected_transition(order_id, OrderStatus.CONFIRMED)
 
-                # Получаем заказ для события
-                order = await self.get_order(order_id)
-                await self._publish_order_confirmed_event(order)
-
-                return True
-            else:
-                logger.warning(f"⚠️ Order {order_id} not found for confirmation")
-                return False
+            logger.info(f"✅ Order {order_id} confirmed")
+            await self._publish_order_confirmed_event(order)
+            return True
 
         except Exception as e:
             await self.db.rollback()
@@ -124,25 +260,15 @@ class OrderService:
     async def cancel_order(self, order_id: str, reason: str = None) -> bool:
         """Отменяет заказ"""
         try:
-            # Обновляем статус заказа
-            query = update(Order).where(Order.id == order_id).values(
-                status=OrderStatus.CANCELLED
-            )
-
-            result = await self.db.execute(query)
+            order = await self._change_status(order_id, {"status": OrderStatus.CANCELLED})
             await self.db.commit()
 
-            if result.rowcount > 0:
-                logger.info(f"❌ Order {order_id} cancelled: {reason}")
-
-                # Получаем заказ для события
-                order = await self.get_order(order_id)
-                await self._publish_order_cancelled_event(order, reason)
+            if order is None:
+                return await self._check_rejected_transition(order_id, OrderStatus.CANCELLED)
 
-                return True
-            else:
-                logger.warning(f"⚠️ Order {order_id} not found for cancellation")
-                return False
+            logger.info(f"❌ Order {order_id} cancelled: {reason}")
+            await self._publish_order_cancelled_event(order, reason)
+            return True
 
         except Exception as e:
             await self.db.rollback()
@@ -160,50 +286,113 @@ class OrderService:
             elif status == OrderStatus.DELIVERED:
                 update_data["delivered_at"] = datetime.utcnow()
 
-            query = update(Order).where(Order.id == order_id).values(**update_data)
-
-            result = await self.db.execute(query)
+            order = await self._change_status(order_id, update_data)
             await self.db.commit()
 
-            if result.rowcount > 0:
-                logger.info(f"✅ Order {order_id} status updated to {status}")
+            if order is None:
+                return await self._check_rejected_transition(order_id, status)
 
-                # Публикуем соответствующее событие
-                if status == OrderStatus.SHIPPED:
-                    order = await self.get_order(order_id)
-                    await self._publish_order_shipped_event(order)
+            logger.info(f"✅ Order {order_id} status updated to {status}")
+
+            # Публикуем соответствующее событие
+            if status == OrderStatus.SHIPPED:
+                await self._publish_order_shipped_event(order)
 
-                return True
-            else:
-                logger.warning(f"⚠️ Order {order_id} not found for status update")
-                return False
+            return True
 
         except Exception as e:
             await self.db.rollback()
             logger.error(f"❌ Error updating order {order_id} status: {e}")
             raise
 
+    async def _change_status(self, order_id: str, values: Dict[str, Any]) -> Optional[Row]:
+        """
+        Переводит заказ в статус values["status"] и обновляет order_counters (без коммита).
+
+        Оптимистичная блокировка: одна команда читает текущие status и version
+        (только если переход разрешён ORDER_STATUS_TRANSITIONS) и обновляет
+        строку при неизменной version, возвращая прежний статус и колонки
+        ORDER_EVENT_COLUMNS. Если строку успели изменить, попытка повторяется
+        после короткой паузы. None — заказа нет или переход не разрешён.
+        """
+        target = values["status"]
+
+        for attempt in range(1, settings.order_status_max_attempts + 1):
+            snapshot = (
+                select(Order.id, Order.status, Order.version)
+                .where(Order.id == order_id, Order.status.in_(ORDER_STATUS_TRANSITIONS[target]))
+                .cte("snapshot")
+            )
+            result = await self.db.execute(
+                update(Order)
+                .where(Order.id == snapshot.c.id, Order.version == snapshot.c.version)
+                .values(**values, version=snapshot.c.version + 1)
+                .returning(snapshot.c.status.label("previous_status"), *ORDER_EVENT_COLUMNS)
+            )
+            order = result.first()
+
+            if order is not None:
+                deltas = self.counters.new_deltas()
+                self.counters.transition(deltas, order.previous_status, target, order.user_id)
+                await self.counters.apply(deltas)
+                return order
+
+            # Гонку проиграли, только если переход из текущего статуса всё ещё разрешён
+            status = await self.db.scalar(select(Order.status).where(Order.id == order_id))
+            if status not in ORDER_STATUS_TRANSITIONS[target]:
+                return None
+
+            delay = settings.order_status_retry_backoff_ms * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            logger.info(f"🔁 Order {order_id} changed concurrently, retrying in {delay:.0f} ms (attempt {attempt})")
+            await asyncio.sleep(delay / 1000)
+
+        raise RuntimeError(
+            f"Order {order_id} status change to {target.value} lost "
+            f"{settings.order_status_max_attempts} concurrent update races"
+        )
+
+    async def _check_rejected_transition(self, order_id: str, target: OrderStatus) -> bool:
+        """
+        Разбирает отказ _change_status (запрос только на этом пути).
+
+        False — заказа нет; True — заказ уже в целевом статусе (повторное
+        событие, ничего не публикуем); ValueError — переход запрещён.
+        """
+        current = await self.db.scalar(select(Order.status).where(Order.id == order_id))
+        if current is None:
+            logger.warning(f"⚠️ Order {order_id} not found for status change to {target.value}")
+            return False
+        if current == target:
+            logger.info(f"⏭️ Order {order_id} is already {target.value}, skipping")
+            return True
+        raise ValueError(f"Order {order_id} cannot change status from {current.value} to {target.value}")
+
+    @staticmethod
+    def _order_created_payload(order: Order, items: List[OrderItem]) -> Dict[str, Any]:
+        """Данные события order_created"""
+        return {
+            "order_id": order.id,
+            "cart_id": order.cart_id,
+            "user_id": order.user_id,
+            "total_amount": float(order.final_amount),
+            "total_items": order.total_items,
+            "status": order.status.value,
+            "items": [
+                {
+                    "product_id": item.product_id,
+                    "product_name": item.product_name,
+                    "quantity": item.quantity,
+                    "unit_price": float(item.unit_price),
+                    "total_price": float(item.total_price)
+                } for item in items
+            ],
+            "created_at": order.created_at.isoformat()
+        }
+
     async def _publish_order_created_event(self, order: Order, items: List[OrderItem]):
         """Публикует событие создания заказа"""
         try:
-            payload = {
-                "order_id": order.id,
-                "cart_id": order.cart_id,
-                "user_id": order.user_id,
-                "total_amount": float(order.final_amount),
-                "total_items": order.total_items,
-                "status": order.status.value,
-                "items": [
-                    {
-                        "product_id": item.product_id,
-                        "product_name": item.product_name,
-                        "quantity": item.quantity,
-                        "unit_price": float(item.unit_price),
-                        "total_price": float(item.total_price)
-                    } for item in items
-                ],
-                "created_at": order.created_at.isoformat()
-            }
+            payload = self._order_created_payload(order, items)
 
             await order_event_producer.publish_order_created(payload)
             logger.info(f"📤 Published order_created event for order {order.id}")
@@ -211,8 +400,8 @@ class OrderService:
         except Exception as e:
             logger.error(f"❌ Failed to publish order_created event: {e}")
 
-    async def _publish_order_confirmed_event(self, order: Order):
-        """Публикует событие подтверждения заказа"""
+    async def _publish_order_confirmed_event(self, order: Row):
+        """Публикует событие подтверждения заказа (order — строка RETURNING _change_status)"""
         try:
             payload = {
                 "order_id": order.id,
@@ -228,8 +417,8 @@ class OrderService:
         except Exception as e:
             logger.error(f"❌ Failed to publish order_confirmed event: {e}")
 
-    async def _publish_order_cancelled_event(self, order: Order, reason: str = None):
-        """Публикует событие отмены заказа"""
+    async def _publish_order_cancelled_event(self, order: Row, reason: str = None):
+        """Публикует событие отмены заказа (order — строка RETURNING _change_status)"""
         try:
             payload = {
                 "order_id": order.id,
@@ -245,8 +434,8 @@ class OrderService:
         except Exception as e:
             logger.error(f"❌ Failed to publish order_cancelled event: {e}")
 
-    async def _publish_order_shipped_event(self, order: Order):
-        """Публикует событие отправки заказа"""
+    async def _publish_order_shipped_event(self, order: Row):
+        """Публикует событие отправки заказа (order — строка RETURNING _change_status)"""
         try:
             payload = {
                 "order_id": order.id,
@@ -268,23 +457,22 @@ class OrderService:
             skip: int = 0,
             limit: int = 100,
             status: Optional[OrderStatus] = None,
-            user_id: Optional[str] = None
+            user_id: Optional[str] = None,
+            after: Optional[Tuple[datetime, str]] = None
     ) -> List[Order]:
-        """Получает список заказов с фильтрами и пагинацией"""
+        """
+        Получает список заказов с фильтрами и пагинацией.
+
+        after — ключ (created_at, id) последнего заказа предыдущей страницы:
+        keyset-пагинация идёт по индексам (status|user_id, created_at, id)
+        и не замедляется на глубоких страницах, в отличие от skip.
+        """
         try:
             query = select(Order).options(
                 selectinload(Order.items),
                 selectinload(Order.payments)
             )
-
-            # Применяем фильтры
-            if status:
-                query = query.where(Order.status == status)
-            if user_id:
-                query = query.where(Order.user_id == user_id)
-
-            # Добавляем сортировку и пагинацию
-            query = query.order_by(Order.created_at.desc()).offset(skip).limit(limit)
+            query = self._list_page(query, skip, limit, status, user_id, after)
 
             result = await self.db.execute(query)
             return result.scalars().all()
@@ -293,6 +481,59 @@ class OrderService:
             logger.error(f"❌ Error getting orders list: {e}")
             raise
 
+    async def get_order_summaries(
+            self,
+            skip: int = 0,
+            limit: int = 100,
+            status: Optional[OrderStatus] = None,
+            user_id: Optional[str] = None,
+            after: Optional[Tuple[datetime, str]] = None,
+            include_items: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Облегчённый список заказов: только колонки ORDER_SUMMARY_COLUMNS.
+
+        Строки читаются кортежами, минуя identity map и загрузку связей ORM.
+        Позиции подгружаются одним запросом по id страницы, только если
+        include_items; платежи в список не входят.
+        """
+        try:
+            query = self._list_page(select(*ORDER_SUMMARY_COLUMNS), skip, limit, status, user_id, after)
+            rows = (await self.db.execute(query)).all()
+
+            items_by_order: Dict[str, List[Dict[str, Any]]] = {}
+            if include_items and rows:
+                items = await self.db.execute(
+                    select(*ORDER_ITEM_COLUMNS)
+                    .where(OrderItem.order_id.in_([row.id for row in rows]))
+                    .order_by(OrderItem.order_id, OrderItem.id)
+                )
+                for item in items.mappings():
+                    items_by_order.setdefault(item["order_id"], []).append(dict(item))
+
+            return [{**row._mapping, "items": items_by_order.get(row.id, [])} for row in rows]
+
+        except Exception as e:
+            logger.error(f"❌ Error getting orders summary list: {e}")
+            raise
+
+    @staticmethod
+    def _list_page(query, skip: int, limit: int, status: Optional[OrderStatus], user_id: Optional[str],
+                   after: Optional[Tuple[datetime, str]]):
+        """Фильтры, порядок и пагинация (skip или keyset по after) списка заказов"""
+        if status:
+            query = query.where(Order.status == status)
+        if user_id:
+            query = query.where(Order.user_id == user_id)
+
+        if after:
+            query = query.where(tuple_(Order.created_at, Order.id) < tuple_(*after))
+        elif skip:
+            query = query.offset(skip)
+
+        # id — тай-брейкер для заказов с одинаковым created_at
+        return query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit)
+
     async def count_orders(
             self,
             status: Optional[OrderStatus] = None,
@@ -314,3 +555,16 @@ class OrderService:
         except Exception as e:
             logger.error(f"❌ Error counting orders: {e}")
             raise
+
+    async def count_orders_cached(
+            self,
+            status: Optional[OrderStatus] = None,
+            user_id: Optional[str] = None
+    ) -> int:
+        """Количество заказов с фильтрами из order_counters, без сканирования orders"""
+        try:
+            return await self.counters.count(status=status, user_id=user_id)
+
+        except Exception as e:
+            logger.error(f"❌ Error reading order counters: {e}")
+            raise
@@ -141,20 +141,25 @@ class PaymentService:
             logger.error(f"❌ Error processing mock payment {payment_id}: {e}")
             raise
 
+    @staticmethod
+    def payment_requested_payload(payment: Payment, order: Order) -> Dict[str, Any]:
+        """Данные события payment_requested"""
+        return {
+            "payment_id": payment.id,
+            "order_id": order.id,
+            "amount": float(payment.amount),
+            "currency": payment.currency,
+            "method": payment.method.value,
+            "status": payment.status.value,
+            "cart_id": order.cart_id,
+            "user_id": order.user_id,
+            "created_at": payment.created_at.isoformat()
+        }
+
     async def _publish_payment_requested_event(self, payment: Payment, order: Order):
         """Публикует событие запроса на оплату"""
         try:
-            payload = {
-                "payment_id": payment.id,
-                "order_id": order.id,
-                "amount": float(payment.amount),
-                "currency": payment.currency,
-                "method": payment.method.value,
-                "status": payment.status.value,
-                "cart_id": order.cart_id,
-                "user_id": order.user_id,
-                "created_at": payment.created_at.isoformat()
-            }
+            payload = self.payment_requested_payload(payment, order)
 
             await order_event_producer.publish_payment_requested(payload)
             logger.info(f"📤 Published payment_requested event for payment {payment.id}")
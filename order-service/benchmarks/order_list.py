@@ -0,0 +1,98 @@
+"""
+Бенчмарк списка заказов order-service (GET /api/v1/orders).
+
+Запрашивает страницы по 100 заказов в облегчённом режиме и с ?include=items
+и печатает p50/p95/p99 задержки и пропускную способность для каждого режима.
+Полезен до и после изменения — на одном и том же стенде с заполненной
+таблицей orders.
+
+Пример:
+    python benchmarks/order_list.py --url http://localhost:8002 --concurrency 10 --requests 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+PAGE_SIZE = 100
+
+MODES = {
+    "summary": {"per_page": PAGE_SIZE},
+    "include=items": {"per_page": PAGE_SIZE, "include": "items"},
+}
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Перцентиль по отсортированной выборке"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+async def worker(client: httpx.AsyncClient, params: dict, queue: asyncio.Queue,
+                 latencies: list[float], errors: list[int], rows: list[int]):
+    """Клиент, выполняющий запросы из общей очереди"""
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        started = time.perf_counter()
+        try:
+            response = await client.get("/api/v1/orders/", params=params)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+            else:
+                rows.append(len(response.json()["orders"]))
+        except httpx.HTTPError:
+            errors.append(0)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def run_mode(client: httpx.AsyncClient, name: str, params: dict, concurrency: int, total: int):
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    latencies: list[float] = []
+    errors: list[int] = []
+    rows: list[int] = []
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(client, params, queue, latencies, errors, rows) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"[{name}]")
+    print(f"  requests:   {len(latencies)} ({len(errors)} errors), rows/page: {statistics.mean(rows) if rows else 0:.0f}")
+    print(f"  throughput: {len(latencies) / elapsed:.1f} req/s")
+    print(f"  mean:       {statistics.mean(latencies):.2f} ms")
+    print(f"  p50:        {percentile(latencies, 50):.2f} ms")
+    print(f"  p95:        {percentile(latencies, 95):.2f} ms")
+    print(f"  p99:        {percentile(latencies, 99):.2f} ms")
+
+
+async def run(url: str, concurrency: int, total: int, warmup: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=30.0, limits=limits) as client:
+        for name, params in MODES.items():
+            # Прогрев пула соединений и кэша планов
+            for _ in range(warmup):
+                await client.get("/api/v1/orders/", params=params)
+            await run_mode(client, name, params, concurrency, total)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Order list latency benchmark (100-row pages)")
+    parser.add_argument("--url", default="http://localhost:8002")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.concurrency, args.requests, args.warmup))
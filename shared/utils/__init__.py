@@ -0,0 +1,33 @@
+from .consumer_engine import BatchCollector, PartitionWorker, PartitionedConsumerEngine
+from .kafka_utils import (
+    CONTENT_TYPE_HEADER,
+    EVENT_ID_HEADER,
+    EVENT_TYPE_HEADER,
+    PRODUCER_SERVICE_HEADER,
+    JsonCodec,
+    MsgpackCodec,
+    decode_event,
+    encode_event,
+    get_codec,
+    get_codec_for_content_type,
+    get_event_type,
+    get_header,
+)
+
+__all__ = [
+    "BatchCollector",
+    "CONTENT_TYPE_HEADER",
+    "EVENT_ID_HEADER",
+    "EVENT_TYPE_HEADER",
+    "PRODUCER_SERVICE_HEADER",
+    "JsonCodec",
+    "MsgpackCodec",
+    "PartitionWorker",
+    "PartitionedConsumerEngine",
+    "decode_event",
+    "encode_event",
+    "get_codec",
+    "get_codec_for_content_type",
+    "get_event_type",
+    "get_header",
+]
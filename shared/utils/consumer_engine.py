@@ -0,0 +1,359 @@
+"""
+Движок параллельной обработки сообщений Kafka, общий для всех консьюмеров.
+
+Каждая назначенная партиция обрабатывается своим воркером, поэтому медленный
+обработчик задерживает только свою партицию. Внутри партиции сообщения с
+разными ключами обрабатываются параллельно (не больше max_in_flight
+одновременно), а с одинаковым ключом — строго по порядку offset'ов.
+Коммитится только непрерывный префикс обработанных offset'ов партиции —
+пачкой раз в commit_every сообщений или commit_interval_ms, а также при
+отзыве партиций ребалансировкой (at-least-once).
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+from aiokafka.abc import ConsumerRebalanceListener
+
+logger = logging.getLogger(__name__)
+
+# Обработка одной записи; исключения логируются и не останавливают партицию
+MessageProcessor = Callable[[Any], Awaitable[None]]
+
+# Обработка пачки событий
+BatchHandler = Callable[[List[Any]], Awaitable[None]]
+
+
+class PartitionWorker:
+    """Очередь и обработка сообщений одной партиции"""
+
+    def __init__(self, tp, process: MessageProcessor, max_in_flight: int):
+        self.tp = tp
+        self.process = process
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.committed: Optional[int] = None  # Последний закоммиченный offset
+        self.committable: Optional[int] = None  # Следующий offset после непрерывно обработанных
+        self.uncommitted = 0  # Обработано с момента последнего коммита
+
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._key_tails: Dict[Any, asyncio.Task] = {}  # Последняя задача по ключу
+        self._pending: Deque[int] = deque()  # Offset'ы в работе, по порядку
+        self._done: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._outstanding = 0  # Принято и ещё не обработано
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    @property
+    def backlog(self) -> int:
+        """Сообщений в очереди и в обработке"""
+        return self._outstanding
+
+    def submit(self, messages):
+        """Ставит сообщения партиции в очередь (в порядке offset'ов)"""
+        for message in messages:
+            self.queue.put_nowait(message)
+        self._outstanding += len(messages)
+        if self._outstanding:
+            self._idle.clear()
+
+    async def _dispatch(self):
+        """Запускает обработку по мере освобождения слотов in-flight"""
+        while True:
+            message = await self.queue.get()
+            await self._semaphore.acquire()
+
+            self._pending.append(message.offset)
+            previous = self._key_tails.get(message.key) if message.key is not None else None
+            task = asyncio.create_task(self._handle(message, previous))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            if message.key is not None:
+                self._key_tails[message.key] = task
+
+    async def _handle(self, message, previous: Optional[asyncio.Task]):
+        """Обработка сообщения после предыдущего с тем же ключом"""
+        try:
+            if previous is not None:
+                await asyncio.wait({previous})
+            try:
+                await self.process(message)
+            except Exception as e:
+                logger.error(f"❌ Error processing {self.tp.topic}[{self.tp.partition}]@{message.offset}: {e}")
+            # Отменённая обработка (close) не считается выполненной и не коммитится
+            self._mark_done(message.offset)
+        finally:
+            self._semaphore.release()
+            if self._key_tails.get(message.key) is asyncio.current_task():
+                del self._key_tails[message.key]
+
+    def _mark_done(self, offset: int):
+        """Сдвигает committable по непрерывно обработанным offset'ам"""
+        self._done.add(offset)
+        while self._pending and self._pending[0] in self._done:
+            done = self._pending.popleft()
+            self._done.discard(done)
+            self.committable = done + 1
+        self.uncommitted += 1
+        self._outstanding -= 1
+        if not self._outstanding:
+            self._idle.set()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт обработки всего принятого; False — не успели за timeout"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self):
+        """Останавливает воркер, прерывая незавершённую обработку"""
+        self._dispatcher.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(self._dispatcher, *self._tasks, return_exceptions=True)
+
+
+class PartitionedConsumerEngine:
+    """
+    Цикл чтения aiokafka-консьюмера с параллельной обработкой по партициям.
+
+    Консьюмер должен быть создан с enable_auto_commit=False: движок сам
+    коммитит обработанные offset'ы. Чтобы при ребалансировке дообработать и
+    закоммитить отзываемые партиции, подписку нужно оформить с
+    listener=engine.rebalance_listener(). Партиция, у которой накопилось
+    больше max_buffered сообщений, ставится на паузу до разгрузки.
+    """
+
+    def __init__(
+            self,
+            consumer,
+            process: MessageProcessor,
+            max_in_flight: int = 10,
+            max_buffered: int = 1000,
+            max_records: Optional[int] = None,
+            poll_timeout_ms: int = 1000,
+            commit_every: int = 100,
+            commit_interval_ms: int = 5000,
+            revoke_timeout: float = 10.0
+    ):
+        self.consumer = consumer
+        self.process = process
+        self.max_in_flight = max_in_flight
+        self.max_buffered = max_buffered
+        self.max_records = max_records
+        self.poll_timeout_ms = min(poll_timeout_ms, commit_interval_ms)
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval_ms / 1000
+        self.revoke_timeout = revoke_timeout
+        self.commits = 0
+        self._last_commit = time.monotonic()
+        self.workers: Dict[Any, PartitionWorker] = {}
+        self.running = False
+        self._paused: Set[Any] = set()
+
+    def _worker(self, tp) -> PartitionWorker:
+        worker = self.workers.get(tp)
+        if worker is None:
+            worker = PartitionWorker(tp, self.process, self.max_in_flight)
+            self.workers[tp] = worker
+        return worker
+
+    async def run(self):
+        """Основной цикл: опрос, раздача по партициям, коммит"""
+        self.running = True
+        while self.running:
+            try:
+                timeout_ms = min(self.poll_timeout_ms, 100) if self._paused else self.poll_timeout_ms
+                batches = await self.consumer.getmany(timeout_ms=timeout_ms, max_records=self.max_records)
+
+                for tp, messages in batches.items():
+                    worker = self._worker(tp)
+                    worker.submit(messages)
+                    if worker.backlog >= self.max_buffered and tp not in self._paused:
+                        self.consumer.pause(tp)
+                        self._paused.add(tp)
+
+                await self._drop_unassigned()
+                self._resume_drained()
+                if self._commit_due():
+                    await self.commit()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error in consumer loop: {e}")
+                await asyncio.sleep(1)
+
+    def _resume_drained(self):
+        """Снимает паузу с партиций, разгрузивших очередь наполовину"""
+        resumed = [tp for tp in self._paused if self._worker(tp).backlog < self.max_buffered // 2]
+        if resumed:
+            self.consumer.resume(*resumed)
+            self._paused.difference_update(resumed)
+
+    async def _drop_unassigned(self):
+        """Останавливает воркеры партиций, отобранных ребалансировкой"""
+        assigned = self.consumer.assignment()
+        for tp in [tp for tp in self.workers if tp not in assigned]:
+            await self.workers.pop(tp).close()
+            self._paused.discard(tp)
+
+    def _commit_due(self) -> bool:
+        """Пора коммитить: набралось commit_every сообщений или истёк интервал"""
+        if time.monotonic() - self._last_commit >= self.commit_interval:
+            return True
+        return sum(worker.uncommitted for worker in self.workers.values()) >= self.commit_every
+
+    async def commit(self, partitions: Optional[Iterable[Any]] = None):
+        """Коммит непрерывно обработанных offset'ов (по умолчанию — всех партиций)"""
+        workers = self.workers if partitions is None else {
+            tp: self.workers[tp] for tp in partitions if tp in self.workers
+        }
+        if partitions is None:
+            self._last_commit = time.monotonic()
+
+        offsets = {}
+        for tp, worker in workers.items():
+            if worker.committable is not None and worker.committable != worker.committed:
+                offsets[tp] = (worker.committable, worker.uncommitted)
+        if not offsets:
+            return
+
+        try:
+            await self.consumer.commit({tp: offset for tp, (offset, _) in offsets.items()})
+        except Exception as e:
+            logger.error(f"❌ Failed to commit offsets: {e}")
+            return
+
+        self.commits += 1
+        for tp, (offset, processed) in offsets.items():
+            worker = workers[tp]
+            worker.committed = offset
+            worker.uncommitted -= processed
+
+    def rebalance_listener(self) -> ConsumerRebalanceListener:
+        """Listener для consumer.subscribe(): коммит отзываемых партиций"""
+        return _EngineRebalanceListener(self)
+
+    async def on_partitions_revoked(self, revoked: Iterable[Any]):
+        """Дообрабатывает принятые сообщения отзываемых партиций и коммитит их"""
+        workers = {tp: self.workers[tp] for tp in revoked if tp in self.workers}
+        if not workers:
+            return
+
+        drained = await asyncio.gather(*(worker.drain(self.revoke_timeout) for worker in workers.values()))
+        if not all(drained):
+            logger.warning("⚠️ Revoked partitions not fully processed in time, unprocessed records will be redelivered")
+
+        await self.commit(workers.keys())
+
+        for tp, worker in workers.items():
+            await worker.close()
+            self.workers.pop(tp, None)
+            self._paused.discard(tp)
+
+    async def stop(self, timeout: float = 10.0):
+        """Останавливает цикл, дорабатывает принятые сообщения и коммитит их"""
+        self.running = False
+        if self.workers:
+            await asyncio.gather(*(worker.drain(timeout) for worker in self.workers.values()))
+            await self.commit()
+            await asyncio.gather(*(worker.close() for worker in self.workers.values()))
+            self.workers.clear()
+        self._paused.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние партиций: backlog и закоммиченный offset"""
+        return {
+            f"{tp.topic}[{tp.partition}]": {
+                "backlog": worker.backlog,
+                "committed": worker.committed,
+                "paused": tp in self._paused
+            }
+            for tp, worker in self.workers.items()
+        }
+
+
+class BatchCollector:
+    """
+    Собирает события из параллельно обрабатываемых записей в пачки.
+
+    submit() ждёт, пока пачка с событием будет обработана, поэтому запись
+    считается обработанной (и её offset коммитится) только после handler'а.
+    Пачка отправляется при max_size событиях или через max_wait_ms после
+    первого. Размер пачки ограничен числом записей в обработке
+    (max_in_flight × число партиций).
+    """
+
+    def __init__(self, handler: BatchHandler, max_size: int = 100, max_wait_ms: int = 50):
+        self.handler = handler
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self._items: List[Any] = []
+        self._waiters: List[asyncio.Future] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any):
+        """Добавляет событие в пачку и ждёт её обработки (ошибка handler'а пробрасывается)"""
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._items.append(item)
+        self._waiters.append(waiter)
+
+        if len(self._items) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        await waiter
+
+    def _flush(self):
+        """Отправляет накопленную пачку в handler"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._items:
+            return
+
+        items, waiters = self._items, self._waiters
+        self._items, self._waiters = [], []
+        task = asyncio.create_task(self._run(items, waiters))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items: List[Any], waiters: List[asyncio.Future]):
+        try:
+            await self.handler(items)
+        except Exception as e:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+        else:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+        finally:
+            # Задачу отменили (остановка, ребалансировка): submit() не должен
+            # ждать вечно — отменяем ожидание, CancelledError пробрасывается дальше
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.cancel()
+
+
+class _EngineRebalanceListener(ConsumerRebalanceListener):
+    """Передаёт события ребалансировки движку"""
+
+    def __init__(self, engine: PartitionedConsumerEngine):
+        self.engine = engine
+
+    async def on_partitions_revoked(self, revoked):
+        await self.engine.on_partitions_revoked(revoked)
+
+    async def on_partitions_assigned(self, assigned):
+        pass
@@ -0,0 +1,150 @@
+"""
+Кодеки событий Kafka, общие для всех сервисов.
+
+Продюсер сериализует событие выбранным кодеком и записывает его тип в
+заголовок ``content-type``; консьюмер выбирает кодек по этому заголовку.
+Сообщения без заголовка считаются JSON — так читаются события, отправленные
+старыми версиями сервисов.
+
+Поля конверта event_type, event_id и producer_service дублируются в
+заголовках, чтобы консьюмер мог маршрутизировать событие и пропускать
+ненужные без десериализации значения.
+
+orjson и msgpack — необязательные зависимости: без orjson JSON-кодек
+работает на стандартном json, без msgpack кодек ``msgpack`` недоступен.
+"""
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - зависит от окружения
+    msgpack = None
+
+CONTENT_TYPE_HEADER = "content-type"
+EVENT_TYPE_HEADER = "event_type"
+EVENT_ID_HEADER = "event_id"
+PRODUCER_SERVICE_HEADER = "producer_service"
+
+# Поля конверта события, которые копируются в заголовки
+_ENVELOPE_HEADERS = (EVENT_TYPE_HEADER, EVENT_ID_HEADER, PRODUCER_SERVICE_HEADER)
+
+# Заголовки записи Kafka в формате aiokafka
+KafkaHeaders = List[Tuple[str, bytes]]
+
+
+class JsonCodec:
+    """JSON. С orjson кодирует сразу в bytes, минуя промежуточный str"""
+
+    name = "json"
+    content_type = "application/json"
+
+    def encode(self, value: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(value).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data.decode("utf-8"))
+
+
+class StdlibJsonCodec(JsonCodec):
+    """JSON только на стандартной библиотеке (для сравнения и отладки)"""
+
+    name = "stdlib-json"
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data.decode("utf-8"))
+
+
+class MsgpackCodec:
+    """MessagePack: компактнее JSON и быстрее разбирается"""
+
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise RuntimeError("msgpack codec requires the 'msgpack' package")
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+_CODEC_CLASSES = {
+    JsonCodec.name: JsonCodec,
+    StdlibJsonCodec.name: StdlibJsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+_codecs: Dict[str, Any] = {}
+
+
+def get_codec(name: str = "json"):
+    """Кодек по имени из настроек (json / stdlib-json / msgpack)"""
+    codec = _codecs.get(name)
+    if codec is None:
+        try:
+            codec = _CODEC_CLASSES[name]()
+        except KeyError:
+            raise ValueError(f"Unknown event codec: {name}")
+        _codecs[name] = codec
+    return codec
+
+
+def get_codec_for_content_type(content_type: Optional[str]):
+    """Кодек по заголовку content-type; без заголовка — JSON"""
+    if not content_type or content_type == JsonCodec.content_type:
+        return get_codec(JsonCodec.name)
+    if content_type == MsgpackCodec.content_type:
+        return get_codec(MsgpackCodec.name)
+    raise ValueError(f"Unsupported event content type: {content_type}")
+
+
+def get_header(headers: Optional[Sequence[Tuple[str, bytes]]], name: str) -> Optional[str]:
+    """Значение заголовка записи Kafka как str (или None)"""
+    for key, value in headers or ():
+        if key == name and value is not None:
+            return value.decode("utf-8")
+    return None
+
+
+def encode_event(event: Any, codec=None) -> Tuple[bytes, KafkaHeaders]:
+    """
+    Сериализует событие; возвращает value и заголовки для producer.send().
+
+    Помимо content-type в заголовки попадают event_type, event_id и
+    producer_service из конверта события.
+    """
+    codec = codec or get_codec()
+    headers = [(CONTENT_TYPE_HEADER, codec.content_type.encode("utf-8"))]
+    if isinstance(event, dict):
+        for name in _ENVELOPE_HEADERS:
+            value = event.get(name)
+            if value is not None:
+                headers.append((name, str(value).encode("utf-8")))
+    return codec.encode(event), headers
+
+
+def get_event_type(headers: Optional[Sequence[Tuple[str, bytes]]]) -> Optional[str]:
+    """Тип события из заголовков; None — продюсер заголовки не проставил"""
+    return get_header(headers, EVENT_TYPE_HEADER)
+
+
+def decode_event(value: bytes, headers: Optional[Sequence[Tuple[str, bytes]]] = None) -> Any:
+    """Десериализует значение записи кодеком из заголовка content-type"""
+    codec = get_codec_for_content_type(get_header(headers, CONTENT_TYPE_HEADER))
+    return codec.decode(value)